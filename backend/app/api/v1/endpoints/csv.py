@@ -1,10 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from fastapi.responses import StreamingResponse
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import csv
-import json
 import io
 import zipfile
+from itertools import islice
 from typing import List, Optional
 
 from app.database import get_db
@@ -14,14 +15,20 @@ from app.models.prompt import Prompt
 from app.models.judge import JudgeConfig, JudgeResult
 from app.models.function_eval import FunctionEvalConfig, FunctionEvalResult
 from app.models.metric import Metric
-from app.utils import parse_json_safe, get_or_404
+from app.models.gepa import GepaConfig
+from app.utils import parse_json_safe, get_or_404, insert_returning
+from app.api.v1.endpoints.metric import invalidate_metrics_cache
+from app.services.prompt_cache import invalidate_prompt_cache
 from app.schemas.csv_data import CSVFileResponse, CSVFileWithRowsResponse, CSVRowResponse, DropColumnsRequest, RenameColumnRequest
 
 router = APIRouter()
 
+# Rows per multi-row INSERT batch when storing an uploaded CSV
+CSV_ROW_INSERT_BATCH_SIZE = 5000
+
 
 @router.post("/upload", response_model=CSVFileResponse)
-async def upload_csv(
+def upload_csv(
     file: UploadFile = File(...), 
     db: Session = Depends(get_db)
 ) -> CSVFileResponse:
@@ -31,7 +38,7 @@ async def upload_csv(
     
     try:
         # Read CSV file
-        contents = await file.read()
+        contents = file.file.read()
         if not contents:
             raise HTTPException(status_code=400, detail="CSV file is empty")
         
@@ -47,42 +54,41 @@ async def upload_csv(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error reading CSV file: {str(e)}")
     
-    # Create CSVFile record
-    csv_file_record = CSVFile(
-        filename=file.filename,
-        columns=json.dumps(list(columns))
-    )
-    db.add(csv_file_record)
-    db.flush()  # Get the ID
-    
-    # Read and store rows (original data only)
-    rows = []
     try:
-        for row_dict in reader:
-            row = CSVRow(
-                csv_file_id=csv_file_record.id,
-                row_data=json.dumps(row_dict)
-            )
-            rows.append(row)
+        # Create CSVFile record
+        csv_file_record = insert_returning(db, CSVFile, dict(
+            filename=file.filename,
+            columns=list(columns)
+        ))
         
-        db.add_all(rows)
+        # Read and store rows (original data only) as multi-row INSERTs, a batch at a
+        # time, without building ORM objects
+        row_count = 0
+        while batch := [
+            {"csv_file_id": csv_file_record.id, "row_data": row_dict}
+            for row_dict in islice(reader, CSV_ROW_INSERT_BATCH_SIZE)
+        ]:
+            db.execute(insert(CSVRow), batch)
+            row_count += len(batch)
+        
+        # Build the response before commit, which would expire the record
+        response = CSVFileResponse(
+            id=csv_file_record.id,
+            filename=csv_file_record.filename,
+            uploaded_at=csv_file_record.uploaded_at,
+            columns=list(columns),
+            row_count=row_count
+        )
         db.commit()
-        db.refresh(csv_file_record)
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error storing CSV data: {str(e)}")
     
-    return CSVFileResponse(
-        id=csv_file_record.id,
-        filename=csv_file_record.filename,
-        uploaded_at=csv_file_record.uploaded_at,
-        columns=parse_json_safe(csv_file_record.columns, []),
-        row_count=len(rows)
-    )
+    return response
 
 
 @router.get("/", response_model=List[CSVFileResponse])
-async def list_csv_files(db: Session = Depends(get_db)) -> List[CSVFileResponse]:
+def list_csv_files(db: Session = Depends(get_db)) -> List[CSVFileResponse]:
     """List all uploaded CSV files"""
     csv_files = db.query(CSVFile).all()
     result = []
@@ -99,7 +105,7 @@ async def list_csv_files(db: Session = Depends(get_db)) -> List[CSVFileResponse]
 
 
 @router.get("/{csv_id}", response_model=CSVFileWithRowsResponse)
-async def get_csv_data(
+def get_csv_data(
     csv_id: int, 
     db: Session = Depends(get_db)
 ) -> CSVFileWithRowsResponse:
@@ -126,25 +132,29 @@ async def get_csv_data(
 
 
 @router.delete("/{csv_id}")
-async def delete_csv(
+def delete_csv(
     csv_id: int, 
     db: Session = Depends(get_db)
 ) -> dict[str, str | int]:
     """Delete a CSV file and all its rows, evaluations, and prompts"""
     csv_file = get_or_404(db, CSVFile, csv_id, "CSV file not found")
     
-    # Delete prompts associated with this CSV file
-    db.query(Prompt).filter(Prompt.csv_file_id == csv_id).delete()
+    # GEPA configs go first: deleting their base prompt would otherwise try to
+    # SET NULL a required column, depending on the order the cascades fire in
+    db.query(GepaConfig).filter(GepaConfig.csv_file_id == csv_id).delete()
     
-    # Delete the CSVFile record (rows and evaluations will be deleted automatically due to cascade)
+    # Rows, prompts, configs, results and evaluations are removed by the
+    # database's ON DELETE CASCADE without being loaded (passive_deletes)
     db.delete(csv_file)
     db.commit()
+    invalidate_metrics_cache(csv_id)
+    invalidate_prompt_cache()
     
     return {"message": "CSV file deleted successfully", "id": csv_id}
 
 
 @router.post("/{csv_id}/drop-columns", response_model=CSVFileResponse)
-async def drop_columns(
+def drop_columns(
     csv_id: int, 
     request: DropColumnsRequest, 
     db: Session = Depends(get_db)
@@ -171,17 +181,18 @@ async def drop_columns(
     
     # Update columns list
     new_columns = [col for col in current_columns if col not in request.columns]
-    csv_file.columns = json.dumps(new_columns)
+    csv_file.columns = new_columns
     
     # Update all rows to remove the dropped columns
     try:
         rows = db.query(CSVRow).filter(CSVRow.csv_file_id == csv_id).all()
         for row in rows:
-            row_dict = parse_json_safe(row.row_data, {})
+            # Copy so the JSON column sees a new value and gets written
+            row_dict = dict(parse_json_safe(row.row_data, {}))
             # Remove dropped columns from row data
             for col in request.columns:
                 row_dict.pop(col, None)
-            row.row_data = json.dumps(row_dict)
+            row.row_data = row_dict
         
         db.commit()
         db.refresh(csv_file)
@@ -200,7 +211,7 @@ async def drop_columns(
 
 
 @router.post("/{csv_id}/rename-column", response_model=CSVFileResponse)
-async def rename_column(
+def rename_column(
     csv_id: int, 
     request: RenameColumnRequest, 
     db: Session = Depends(get_db)
@@ -233,17 +244,18 @@ async def rename_column(
     
     # Update columns list
     new_columns = [col if col != request.old_name else request.new_name for col in current_columns]
-    csv_file.columns = json.dumps(new_columns)
+    csv_file.columns = new_columns
     
     # Update all rows to rename the column key
     try:
         rows = db.query(CSVRow).filter(CSVRow.csv_file_id == csv_id).all()
         for row in rows:
-            row_dict = parse_json_safe(row.row_data, {})
+            # Copy so the JSON column sees a new value and gets written
+            row_dict = dict(parse_json_safe(row.row_data, {}))
             # Rename the column key in row data
             if request.old_name in row_dict:
                 row_dict[request.new_name] = row_dict.pop(request.old_name)
-            row.row_data = json.dumps(row_dict)
+            row.row_data = row_dict
         
         db.commit()
         db.refresh(csv_file)
@@ -262,7 +274,7 @@ async def rename_column(
 
 
 @router.get("/{csv_id}/export")
-async def export_csv_with_evaluations(
+def export_csv_with_evaluations(
     csv_id: int, 
     prompt_id: int,
     db: Session = Depends(get_db)
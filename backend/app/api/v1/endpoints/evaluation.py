@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 from typing import List, Optional
 
 from app.database import get_db
 from app.models.evaluation import Evaluation
 from app.models.csv_data import CSVFile, CSVRow
-from app.utils import get_or_404
+from app.utils import get_or_404, exists_or_404, insert_returning
 from app.schemas.evaluation import (
     EvaluationResponse,
     UpdateEvaluationRequest,
@@ -16,7 +16,7 @@ router = APIRouter()
 
 
 @router.post("/", response_model=EvaluationResponse)
-async def create_evaluation(
+def create_evaluation(
     request: CreateEvaluationRequest,
     db: Session = Depends(get_db)
 ) -> EvaluationResponse:
@@ -26,7 +26,7 @@ async def create_evaluation(
     
     # Verify prompt exists
     from app.models.prompt import Prompt
-    get_or_404(db, Prompt, request.prompt_id, "Prompt not found")
+    exists_or_404(db, Prompt, request.prompt_id, "Prompt not found")
     
     # Check if evaluation already exists
     existing = db.query(Evaluation).filter(
@@ -37,35 +37,35 @@ async def create_evaluation(
         raise HTTPException(status_code=400, detail="Evaluation already exists for this row and prompt")
     
     try:
-        evaluation = Evaluation(
+        evaluation = insert_returning(db, Evaluation, dict(
             csv_file_id=csv_row.csv_file_id,
             csv_row_id=request.csv_row_id,
             prompt_id=request.prompt_id,
             output=request.output,
             annotation=request.annotation,
             feedback=request.feedback
-        )
-        
-        db.add(evaluation)
+        ))
+        # Build the response before commit, which would expire the returned row
+        response = EvaluationResponse.model_validate(evaluation)
         db.commit()
-        db.refresh(evaluation)
         
-        return evaluation
+        return response
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating evaluation: {str(e)}")
 
 
 @router.get("/csv/{csv_id}", response_model=List[EvaluationResponse])
-async def get_evaluations_for_csv(
+def get_evaluations_for_csv(
     csv_id: int,
     prompt_id: int,
     db: Session = Depends(get_db)
 ) -> List[EvaluationResponse]:
     """Get all evaluations for a CSV file and prompt"""
-    get_or_404(db, CSVFile, csv_id, "CSV file not found")
+    exists_or_404(db, CSVFile, csv_id, "CSV file not found")
     
-    evaluations = db.query(Evaluation).filter(
+    # raiseload: response models only use columns, so any relationship access is a bug (N+1)
+    evaluations = db.query(Evaluation).options(raiseload('*')).filter(
         Evaluation.csv_file_id == csv_id,
         Evaluation.prompt_id == prompt_id
     ).all()
@@ -73,7 +73,7 @@ async def get_evaluations_for_csv(
 
 
 @router.get("/row/{row_id}", response_model=EvaluationResponse)
-async def get_evaluation_for_row(
+def get_evaluation_for_row(
     row_id: int,
     prompt_id: int,
     db: Session = Depends(get_db)
@@ -90,7 +90,7 @@ async def get_evaluation_for_row(
 
 
 @router.patch("/row/{row_id}", response_model=EvaluationResponse)
-async def update_evaluation(
+def update_evaluation(
     row_id: int,
     request: UpdateEvaluationRequest,
     db: Session = Depends(get_db)
@@ -98,7 +98,7 @@ async def update_evaluation(
     """Update evaluation for a specific CSV row and prompt (creates if doesn't exist)"""
     # Verify prompt exists
     from app.models.prompt import Prompt
-    get_or_404(db, Prompt, request.prompt_id, "Prompt not found")
+    exists_or_404(db, Prompt, request.prompt_id, "Prompt not found")
     
     evaluation = db.query(Evaluation).filter(
         Evaluation.csv_row_id == row_id,
@@ -135,7 +135,7 @@ async def update_evaluation(
 
 
 @router.delete("/row/{row_id}")
-async def delete_evaluation(
+def delete_evaluation(
     row_id: int,
     prompt_id: int,
     db: Session = Depends(get_db)
@@ -1,8 +1,8 @@
 """Endpoints for function-based evaluations."""
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 from sqlalchemy import and_
 
 from app.database import get_db
@@ -11,8 +11,9 @@ from app.models.csv_data import CSVFile, CSVRow
 from app.models.evaluation import Evaluation
 from app.models.prompt import Prompt
 from app.services.function_eval_service import (
-    list_function_evaluations,
+    list_function_evaluations_json,
     run_function_evaluation,
+    run_function_evaluation_batch,
     validate_function_name
 )
 from app.schemas.function_eval import (
@@ -23,34 +24,35 @@ from app.schemas.function_eval import (
     CreateFunctionEvalConfigRequest,
     UpdateFunctionEvalConfigRequest,
     FunctionEvalResultResponse,
-    RunFunctionEvalRequest
+    RunFunctionEvalRequest,
+    RunFunctionEvalBatchRequest,
+    FunctionEvalBatchResult
 )
-from app.utils import parse_json_safe, get_or_404
+from app.utils import parse_json_safe, get_or_404, exists_or_404, insert_returning, upsert_returning, etag_response
 
 router = APIRouter()
 
 # --- Plugin Discovery & Testing ---
 
 @router.get("/plugins", response_model=List[FunctionEvaluationInfo])
-async def list_function_evaluations_endpoint() -> List[FunctionEvaluationInfo]:
+def list_function_evaluations_endpoint(request: Request) -> Response:
     """
     List all available function-based evaluation plugins.
+    
+    The listing is encoded once per plugin refresh and served with an ETag.
     """
     try:
-        evaluations = list_function_evaluations()
-        return [
-            FunctionEvaluationInfo(**eval_info)
-            for eval_info in evaluations
-        ]
+        content = list_function_evaluations_json()
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to list function evaluations: {str(e)}"
         )
+    return etag_response(request, content)
 
 
 @router.post("/test", response_model=FunctionEvaluationResultSchema)
-async def test_function_evaluation_endpoint(
+def test_function_evaluation_endpoint(
     request: RunFunctionEvaluationRequest
 ) -> FunctionEvaluationResultSchema:
     """
@@ -84,14 +86,15 @@ async def test_function_evaluation_endpoint(
 # --- Configuration Management ---
 
 @router.get("/configs", response_model=List[FunctionEvalConfigResponse])
-async def list_function_eval_configs(
+def list_function_eval_configs(
     csv_file_id: int,
     db: Session = Depends(get_db)
 ) -> List[FunctionEvalConfigResponse]:
     """List all function eval configs for a CSV file"""
-    get_or_404(db, CSVFile, csv_file_id, "CSV file not found")
+    exists_or_404(db, CSVFile, csv_file_id, "CSV file not found")
     
-    configs = db.query(FunctionEvalConfig).filter(
+    # raiseload: response models only use columns, so any relationship access is a bug (N+1)
+    configs = db.query(FunctionEvalConfig).options(raiseload('*')).filter(
         FunctionEvalConfig.csv_file_id == csv_file_id
     ).order_by(FunctionEvalConfig.created_at.desc()).all()
     
@@ -99,12 +102,12 @@ async def list_function_eval_configs(
 
 
 @router.post("/configs", response_model=FunctionEvalConfigResponse)
-async def create_function_eval_config(
+def create_function_eval_config(
     request: CreateFunctionEvalConfigRequest,
     db: Session = Depends(get_db)
 ) -> FunctionEvalConfigResponse:
     """Create a new function eval config"""
-    get_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
+    exists_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
     
     # Validate that the function_name exists in the registry
     try:
@@ -127,25 +130,24 @@ async def create_function_eval_config(
         )
     
     try:
-        config = FunctionEvalConfig(
+        config = insert_returning(db, FunctionEvalConfig, dict(
             csv_file_id=request.csv_file_id,
             name=request.name,
             function_name=request.function_name,
             config=request.config
-        )
-        
-        db.add(config)
+        ))
+        # Build the response before commit, which would expire the returned row
+        response = FunctionEvalConfigResponse.model_validate(config)
         db.commit()
-        db.refresh(config)
         
-        return config
+        return response
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating function eval config: {str(e)}")
 
 
 @router.put("/configs/{config_id}", response_model=FunctionEvalConfigResponse)
-async def update_function_eval_config(
+def update_function_eval_config(
     config_id: int,
     request: UpdateFunctionEvalConfigRequest,
     db: Session = Depends(get_db)
@@ -185,7 +187,7 @@ async def update_function_eval_config(
 
 
 @router.delete("/configs/{config_id}")
-async def delete_function_eval_config(
+def delete_function_eval_config(
     config_id: int,
     db: Session = Depends(get_db)
 ) -> dict[str, str | int]:
@@ -201,15 +203,15 @@ async def delete_function_eval_config(
 # --- Results Management ---
 
 @router.get("/results/csv/{csv_id}", response_model=List[FunctionEvalResultResponse])
-async def get_function_eval_results_for_csv(
+def get_function_eval_results_for_csv(
     csv_id: int,
     prompt_id: int,
     db: Session = Depends(get_db)
 ) -> List[FunctionEvalResultResponse]:
     """Get all function eval results for a CSV file and prompt"""
-    get_or_404(db, CSVFile, csv_id, "CSV file not found")
+    exists_or_404(db, CSVFile, csv_id, "CSV file not found")
     
-    results = db.query(FunctionEvalResult).filter(
+    results = db.query(FunctionEvalResult).options(raiseload('*')).filter(
         FunctionEvalResult.csv_file_id == csv_id,
         FunctionEvalResult.prompt_id == prompt_id
     ).all()
@@ -218,7 +220,7 @@ async def get_function_eval_results_for_csv(
 
 
 @router.post("/run", response_model=FunctionEvalResultResponse)
-async def run_function_eval(
+def run_function_eval(
     request: RunFunctionEvalRequest,
     db: Session = Depends(get_db)
 ) -> FunctionEvalResultResponse:
@@ -272,44 +274,126 @@ async def run_function_eval(
     details = result_dict.get("details")
     
     # Verify prompt exists
-    get_or_404(db, Prompt, request.prompt_id, "Prompt not found")
+    exists_or_404(db, Prompt, request.prompt_id, "Prompt not found")
     
-    # Get or create function eval result (upsert)
-    result = db.query(FunctionEvalResult).filter(
-        and_(
-            FunctionEvalResult.config_id == config.id,
-            FunctionEvalResult.csv_row_id == request.csv_row_id,
-            FunctionEvalResult.prompt_id == request.prompt_id
+    try:
+        # Get or create function eval result (upsert)
+        result = upsert_returning(
+            db,
+            FunctionEvalResult,
+            match={
+                "config_id": config.id,
+                "csv_row_id": request.csv_row_id,
+                "prompt_id": request.prompt_id,
+            },
+            values={"score": score, "details": details},
+            insert_values={"csv_file_id": csv_row.csv_file_id},
         )
-    ).first()
+        # Serialize before commit so the response doesn't reload the expired row
+        response = FunctionEvalResultResponse.model_validate(result)
+        db.commit()
+        return response
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error saving function eval result: {str(e)}")
+
+
+@router.post("/run/batch", response_model=List[FunctionEvalBatchResult])
+def run_function_eval_batch(
+    request: RunFunctionEvalBatchRequest,
+    db: Session = Depends(get_db)
+) -> List[FunctionEvalBatchResult]:
+    """
+    Run a configured function evaluation for many CSV rows and persist the results.
     
-    if result:
-        # Update existing result
-        result.score = score
-        result.details = details
-    else:
-        # Create new result
-        result = FunctionEvalResult(
-            config_id=config.id,
-            csv_file_id=csv_row.csv_file_id,
-            csv_row_id=request.csv_row_id,
-            prompt_id=request.prompt_id,
-            score=score,
-            details=details
+    Rows and outputs are loaded with one query each, the plugin is resolved once,
+    and all results are saved in a single transaction. Results come back in
+    request order; a row that can't be evaluated carries an error instead.
+    """
+    config = get_or_404(db, FunctionEvalConfig, request.config_id, "Function eval config not found")
+    exists_or_404(db, Prompt, request.prompt_id, "Prompt not found")
+    
+    row_ids = list(dict.fromkeys(request.csv_row_ids))
+    rows = {
+        row_id: (csv_file_id, row_data)
+        for row_id, csv_file_id, row_data in (
+            db.query(CSVRow.id, CSVRow.csv_file_id, CSVRow.row_data)
+            .filter(CSVRow.id.in_(row_ids))
+            .all()
+        )
+    }
+    outputs = dict(
+        db.query(Evaluation.csv_row_id, Evaluation.output)
+        .filter(Evaluation.prompt_id == request.prompt_id, Evaluation.csv_row_id.in_(row_ids))
+        .all()
+    )
+    
+    # Validate each row like /run does, collecting per-row errors
+    results = {row_id: FunctionEvalBatchResult(csv_row_id=row_id) for row_id in row_ids}
+    runnable = []
+    row_datas = []
+    for row_id in row_ids:
+        if row_id not in rows:
+            results[row_id].error = "CSV row not found"
+            continue
+        csv_file_id, row_data = rows[row_id]
+        if csv_file_id != config.csv_file_id:
+            results[row_id].error = "CSV row does not belong to the same CSV file as the function eval config"
+            continue
+        row_data = parse_json_safe(row_data, {})
+        if not row_data:
+            results[row_id].error = "Invalid row data format"
+            continue
+        runnable.append(row_id)
+        row_datas.append(row_data)
+    
+    try:
+        evaluated = run_function_evaluation_batch(
+            name=config.function_name,
+            rows=row_datas,
+            outputs=[outputs.get(row_id) or None for row_id in runnable],
+            config=config.config
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error running function evaluation: {str(e)}"
         )
-        db.add(result)
     
     try:
+        for row_id, result_dict in zip(runnable, evaluated):
+            if isinstance(result_dict, Exception):
+                results[row_id].error = f"Error running function evaluation: {str(result_dict)}"
+                continue
+            # Convert score to float (handle int/bool from plugins); a bad score only fails its row
+            try:
+                score = float(result_dict["score"])
+            except (KeyError, TypeError, ValueError):
+                results[row_id].error = f"Invalid score from function evaluation: {result_dict.get('score')!r}"
+                continue
+            result = upsert_returning(
+                db,
+                FunctionEvalResult,
+                match={
+                    "config_id": config.id,
+                    "csv_row_id": row_id,
+                    "prompt_id": request.prompt_id,
+                },
+                values={"score": score, "details": result_dict.get("details")},
+                insert_values={"csv_file_id": config.csv_file_id},
+            )
+            # Serialize before commit so the response doesn't reload the expired rows
+            results[row_id].result = FunctionEvalResultResponse.model_validate(result)
         db.commit()
-        db.refresh(result)
-        return result
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error saving function eval result: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error saving function eval results: {str(e)}")
+    
+    return list(results.values())
 
 
 @router.delete("/results/config/{config_id}/row/{row_id}")
-async def delete_function_eval_result(
+def delete_function_eval_result(
     config_id: int,
     row_id: int,
     prompt_id: int,
@@ -332,13 +416,13 @@ async def delete_function_eval_result(
 
 
 @router.delete("/results/config/{config_id}")
-async def delete_function_eval_results_for_config(
+def delete_function_eval_results_for_config(
     config_id: int,
     prompt_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ) -> dict[str, str | int]:
     """Delete all function eval results for a specific config, optionally filtered by prompt_id"""
-    get_or_404(db, FunctionEvalConfig, config_id, "Function eval config not found")
+    exists_or_404(db, FunctionEvalConfig, config_id, "Function eval config not found")
     
     query = db.query(FunctionEvalResult).filter(
         FunctionEvalResult.config_id == config_id
@@ -346,7 +430,7 @@ async def delete_function_eval_results_for_config(
     
     # If prompt_id is provided, only delete results for that prompt version
     if prompt_id is not None:
-        get_or_404(db, Prompt, prompt_id, "Prompt not found")
+        exists_or_404(db, Prompt, prompt_id, "Prompt not found")
         query = query.filter(FunctionEvalResult.prompt_id == prompt_id)
     
     deleted_count = query.delete()
@@ -3,12 +3,11 @@ nest_asyncio.apply()
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload, selectinload
 from typing import List
 from sqlalchemy import and_
 import asyncio
 import json
-from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 
 from app.database import get_db
@@ -17,7 +16,7 @@ from app.models.csv_data import CSVFile
 from app.models.prompt import Prompt
 from app.models.judge import JudgeConfig
 from app.models.function_eval import FunctionEvalConfig
-from app.utils import get_or_404
+from app.utils import get_or_404, exists_or_404
 from app.schemas.gepa import (
     GepaConfigResponse,
     CreateGepaConfigRequest,
@@ -25,20 +24,36 @@ from app.schemas.gepa import (
     RunGepaResponse
 )
 from app.services.gepa_service import run_gepa
-from app.services.gepa_progress import get_progress, update_progress, clear_progress
+from app.services.gepa_progress import get_progress, get_progress_with_sequence, update_progress, clear_progress, utc_now_iso
 
 router = APIRouter()
 
+# Pre-encoded SSE framing; only the payload is serialized per event
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_SSE_CLOSED_FRAME = _SSE_PREFIX + json.dumps({"status": "closed"}).encode() + _SSE_SUFFIX
+
+
+def _sse_frame(payload: dict) -> bytes:
+    """Encode a dict as a single SSE data frame"""
+    return _SSE_PREFIX + json.dumps(payload).encode() + _SSE_SUFFIX
+
 
 @router.get("/configs", response_model=List[GepaConfigResponse])
-async def list_gepa_configs(
+def list_gepa_configs(
     csv_file_id: int,
     db: Session = Depends(get_db)
 ) -> List[GepaConfigResponse]:
     """List all GEPA configs for a CSV file"""
-    get_or_404(db, CSVFile, csv_file_id, "CSV file not found")
+    exists_or_404(db, CSVFile, csv_file_id, "CSV file not found")
     
-    configs = db.query(GepaConfig).filter(
+    # raiseload: response models only use columns and the evaluation config links,
+    # so any other relationship access is a bug (N+1)
+    configs = db.query(GepaConfig).options(
+        selectinload(GepaConfig.judge_configs),
+        selectinload(GepaConfig.function_eval_configs),
+        raiseload('*')
+    ).filter(
         GepaConfig.csv_file_id == csv_file_id
     ).order_by(GepaConfig.created_at.desc()).all()
     
@@ -46,20 +61,21 @@ async def list_gepa_configs(
 
 
 @router.post("/configs", response_model=GepaConfigResponse)
-async def create_gepa_config(
+def create_gepa_config(
     request: CreateGepaConfigRequest,
     db: Session = Depends(get_db)
 ) -> GepaConfigResponse:
     """Create a new GEPA config"""
-    get_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
+    exists_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
     
     # Validate base prompt (required)
-    get_or_404(db, Prompt, request.base_prompt_id, "Base prompt not found")
+    exists_or_404(db, Prompt, request.base_prompt_id, "Base prompt not found")
     
     # Validate judge configs if provided
+    judge_configs = []
     if request.judge_config_ids:
         for config_id in request.judge_config_ids:
-            judge_config = db.query(JudgeConfig).filter(JudgeConfig.id == config_id).first()
+            judge_config = db.get(JudgeConfig, config_id)
             if not judge_config:
                 raise HTTPException(status_code=400, detail=f"Judge config {config_id} not found")
             if judge_config.csv_file_id != request.csv_file_id:
@@ -67,13 +83,13 @@ async def create_gepa_config(
                     status_code=400,
                     detail=f"Judge config {config_id} does not belong to CSV file {request.csv_file_id}"
                 )
+            judge_configs.append(judge_config)
     
     # Validate function eval configs if provided
+    function_eval_configs = []
     if request.function_eval_config_ids:
         for config_id in request.function_eval_config_ids:
-            function_eval_config = db.query(FunctionEvalConfig).filter(
-                FunctionEvalConfig.id == config_id
-            ).first()
+            function_eval_config = db.get(FunctionEvalConfig, config_id)
             if not function_eval_config:
                 raise HTTPException(status_code=400, detail=f"Function eval config {config_id} not found")
             if function_eval_config.csv_file_id != request.csv_file_id:
@@ -81,6 +97,7 @@ async def create_gepa_config(
                     status_code=400,
                     detail=f"Function eval config {config_id} does not belong to CSV file {request.csv_file_id}"
                 )
+            function_eval_configs.append(function_eval_config)
     
     # Check if at least one evaluation config is provided
     if not request.judge_config_ids and not request.function_eval_config_ids:
@@ -93,12 +110,13 @@ async def create_gepa_config(
         # Default reflection_model to generator_model if not specified
         reflection_model = request.reflection_model if request.reflection_model is not None else request.generator_model
         
+        # Added through the ORM so the link rows are inserted with the config
         config = GepaConfig(
             csv_file_id=request.csv_file_id,
             name=request.name,
             base_prompt_id=request.base_prompt_id,
-            judge_config_ids=request.judge_config_ids,
-            function_eval_config_ids=request.function_eval_config_ids,
+            judge_configs=list(dict.fromkeys(judge_configs)),
+            function_eval_configs=list(dict.fromkeys(function_eval_configs)),
             generator_model=request.generator_model,
             reflection_model=reflection_model,
             generator_temperature=request.generator_temperature,
@@ -107,19 +125,20 @@ async def create_gepa_config(
             reflection_max_tokens=request.reflection_max_tokens,
             max_metric_calls=request.max_metric_calls
         )
-        
         db.add(config)
+        db.flush()
+        # Build the response before commit, which would expire the new row
+        response = GepaConfigResponse.model_validate(config)
         db.commit()
-        db.refresh(config)
         
-        return config
+        return response
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating GEPA config: {str(e)}")
 
 
 @router.get("/configs/{config_id}", response_model=GepaConfigResponse)
-async def get_gepa_config(
+def get_gepa_config(
     config_id: int,
     db: Session = Depends(get_db)
 ) -> GepaConfigResponse:
@@ -128,7 +147,7 @@ async def get_gepa_config(
 
 
 @router.put("/configs/{config_id}", response_model=GepaConfigResponse)
-async def update_gepa_config(
+def update_gepa_config(
     config_id: int,
     request: UpdateGepaConfigRequest,
     db: Session = Depends(get_db)
@@ -136,16 +155,18 @@ async def update_gepa_config(
     """Update a GEPA config"""
     config = get_or_404(db, GepaConfig, config_id, "GEPA config not found")
     
-    # Validate base prompt if provided
+    # Validate base prompt if provided (it's required, so it can't be cleared)
     if request.base_prompt_id is not None:
-        if request.base_prompt_id:
-            get_or_404(db, Prompt, request.base_prompt_id, "Base prompt not found")
+        if not request.base_prompt_id:
+            raise HTTPException(status_code=400, detail="base_prompt_id is required")
+        exists_or_404(db, Prompt, request.base_prompt_id, "Base prompt not found")
         config.base_prompt_id = request.base_prompt_id
     
     # Validate judge configs if provided
     if request.judge_config_ids is not None:
+        judge_configs = []
         for config_id_val in request.judge_config_ids:
-            judge_config = db.query(JudgeConfig).filter(JudgeConfig.id == config_id_val).first()
+            judge_config = db.get(JudgeConfig, config_id_val)
             if not judge_config:
                 raise HTTPException(status_code=400, detail=f"Judge config {config_id_val} not found")
             if judge_config.csv_file_id != config.csv_file_id:
@@ -153,14 +174,14 @@ async def update_gepa_config(
                     status_code=400,
                     detail=f"Judge config {config_id_val} does not belong to CSV file {config.csv_file_id}"
                 )
-        config.judge_config_ids = request.judge_config_ids
+            judge_configs.append(judge_config)
+        config.judge_configs = list(dict.fromkeys(judge_configs))
     
     # Validate function eval configs if provided
     if request.function_eval_config_ids is not None:
+        function_eval_configs = []
         for config_id_val in request.function_eval_config_ids:
-            function_eval_config = db.query(FunctionEvalConfig).filter(
-                FunctionEvalConfig.id == config_id_val
-            ).first()
+            function_eval_config = db.get(FunctionEvalConfig, config_id_val)
             if not function_eval_config:
                 raise HTTPException(status_code=400, detail=f"Function eval config {config_id_val} not found")
             if function_eval_config.csv_file_id != config.csv_file_id:
@@ -168,7 +189,8 @@ async def update_gepa_config(
                     status_code=400,
                     detail=f"Function eval config {config_id_val} does not belong to CSV file {config.csv_file_id}"
                 )
-        config.function_eval_config_ids = request.function_eval_config_ids
+            function_eval_configs.append(function_eval_config)
+        config.function_eval_configs = list(dict.fromkeys(function_eval_configs))
     
     # Update other fields
     if request.name is not None:
@@ -201,7 +223,7 @@ async def update_gepa_config(
 
 
 @router.delete("/configs/{config_id}")
-async def delete_gepa_config(
+def delete_gepa_config(
     config_id: int,
     db: Session = Depends(get_db)
 ) -> dict[str, str | int]:
@@ -251,7 +273,7 @@ def _run_gepa_sync(config_id: int, csv_file_id: int) -> None:
     thread_db = SessionLocal()
     try:
         # Get config in the new session
-        config = thread_db.query(GepaConfig).filter(GepaConfig.id == config_id).first()
+        config = thread_db.get(GepaConfig, config_id)
         if not config:
             from app.services.gepa_progress import set_error
             set_error(config_id, "GEPA config not found")
@@ -268,7 +290,7 @@ def _run_gepa_sync(config_id: int, csv_file_id: int) -> None:
 
 
 @router.post("/configs/{config_id}/run", response_model=RunGepaResponse)
-async def run_gepa_optimization_endpoint(
+def run_gepa_optimization_endpoint(
     config_id: int,
     db: Session = Depends(get_db)
 ) -> RunGepaResponse:
@@ -293,15 +315,8 @@ async def run_gepa_optimization_endpoint(
         message="Initializing optimization..."
     )
     
-    # Run optimization in background thread pool to avoid blocking the event loop
-    # Use get_running_loop() since we're in an async context
-    loop = asyncio.get_running_loop()
-    loop.run_in_executor(
-        _executor,
-        _run_gepa_sync,
-        config_id,
-        config.csv_file_id
-    )
+    # Run optimization in background thread pool so the request returns immediately
+    _executor.submit(_run_gepa_sync, config_id, config.csv_file_id)
     
     # Return immediately - optimization is running in background
     return RunGepaResponse(
@@ -316,19 +331,20 @@ async def run_gepa_optimization_endpoint(
 async def get_gepa_progress_stream(config_id: int):
     """Stream GEPA optimization progress via Server-Sent Events"""
     async def event_generator():
-        last_progress = None
+        last_sequence = None
         # Send initial empty progress if none exists yet (to establish connection)
         initial_sent = False
         
         while True:
-            progress = get_progress(config_id)
+            versioned = get_progress_with_sequence(config_id)
             
-            # If progress exists and has changed, send update
-            if progress:
-                progress_json = json.dumps(progress)
-                if progress_json != last_progress:
-                    yield f"data: {progress_json}\n\n"
-                    last_progress = progress_json
+            # If progress exists and has changed, send update.
+            # Every write takes a new sequence number, so compare that instead of re-serializing each poll.
+            if versioned:
+                sequence, progress = versioned
+                if sequence != last_sequence:
+                    yield _sse_frame(progress)
+                    last_sequence = sequence
                     initial_sent = True
                     
                     # If completed or error, stop streaming
@@ -343,11 +359,11 @@ async def get_gepa_progress_stream(config_id: int):
                     "current_score": None,
                     "best_score": None,
                     "message": "Waiting for optimization to start...",
-                    "updated_at": datetime.now().isoformat()
+                    "updated_at": utc_now_iso()
                 }
-                yield f"data: {json.dumps(empty_progress)}\n\n"
+                yield _sse_frame(empty_progress)
                 initial_sent = True
-            elif last_progress is not None:
+            elif last_sequence is not None:
                 # Progress was cleared (optimization finished)
                 break
             
@@ -355,7 +371,7 @@ async def get_gepa_progress_stream(config_id: int):
             await asyncio.sleep(0.5)
         
         # Send final message
-        yield f"data: {json.dumps({'status': 'closed'})}\n\n"
+        yield _SSE_CLOSED_FRAME
     
     return StreamingResponse(
         event_generator(),
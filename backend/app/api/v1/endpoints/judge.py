@@ -1,14 +1,17 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, raiseload
+from typing import List, Optional, Tuple, Dict, Any
 from sqlalchemy import and_
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models.judge import JudgeConfig, JudgeResult
-from app.models.csv_data import CSVFile, CSVRow
+from app.models.csv_data import CSVFile
 from app.models.evaluation import Evaluation
-from app.utils import parse_json_safe, get_or_404
+from app.utils import parse_json_safe, parse_columns, get_or_404, exists_or_404, get_row_with_file_or_404, insert_returning, upsert_returning, SingleFlight
 from app.services.judge_service import run_judge_evaluation
+from app.services.llm_service import retry_backoff_delay
 from app.schemas.judge import (
     JudgeConfigResponse,
     CreateJudgeConfigRequest,
@@ -19,16 +22,20 @@ from app.schemas.judge import (
 
 router = APIRouter()
 
+# Concurrent runs for the same (config, row, prompt) share one LLM call and upsert
+_judge_runs = SingleFlight()
+
 
 @router.get("/configs", response_model=List[JudgeConfigResponse])
-async def list_judge_configs(
+def list_judge_configs(
     csv_file_id: int,
     db: Session = Depends(get_db)
 ) -> List[JudgeConfigResponse]:
     """List all judge configs for a CSV file"""
-    get_or_404(db, CSVFile, csv_file_id, "CSV file not found")
+    exists_or_404(db, CSVFile, csv_file_id, "CSV file not found")
     
-    configs = db.query(JudgeConfig).filter(
+    # raiseload: response models only use columns, so any relationship access is a bug (N+1)
+    configs = db.query(JudgeConfig).options(raiseload('*')).filter(
         JudgeConfig.csv_file_id == csv_file_id
     ).order_by(JudgeConfig.created_at.desc()).all()
     
@@ -36,12 +43,12 @@ async def list_judge_configs(
 
 
 @router.post("/configs", response_model=JudgeConfigResponse)
-async def create_judge_config(
+def create_judge_config(
     request: CreateJudgeConfigRequest,
     db: Session = Depends(get_db)
 ) -> JudgeConfigResponse:
     """Create a new judge config (validate name uniqueness per CSV file)"""
-    get_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
+    exists_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
     
     # Check if name already exists for this CSV file
     existing = db.query(JudgeConfig).filter(
@@ -58,27 +65,26 @@ async def create_judge_config(
         )
     
     try:
-        config = JudgeConfig(
+        config = insert_returning(db, JudgeConfig, dict(
             csv_file_id=request.csv_file_id,
             name=request.name,
             prompt=request.prompt,
             model=request.model,
             temperature=request.temperature,
             max_tokens=request.max_tokens
-        )
-        
-        db.add(config)
+        ))
+        # Build the response before commit, which would expire the returned row
+        response = JudgeConfigResponse.model_validate(config)
         db.commit()
-        db.refresh(config)
         
-        return config
+        return response
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating judge config: {str(e)}")
 
 
 @router.put("/configs/{config_id}", response_model=JudgeConfigResponse)
-async def update_judge_config(
+def update_judge_config(
     config_id: int,
     request: UpdateJudgeConfigRequest,
     db: Session = Depends(get_db)
@@ -124,7 +130,7 @@ async def update_judge_config(
 
 
 @router.delete("/configs/{config_id}")
-async def delete_judge_config(
+def delete_judge_config(
     config_id: int,
     db: Session = Depends(get_db)
 ) -> dict[str, str | int]:
@@ -138,15 +144,15 @@ async def delete_judge_config(
 
 
 @router.get("/results/csv/{csv_id}", response_model=List[JudgeResultResponse])
-async def get_judge_results_for_csv(
+def get_judge_results_for_csv(
     csv_id: int,
     prompt_id: int,
     db: Session = Depends(get_db)
 ) -> List[JudgeResultResponse]:
     """Get all judge results for a CSV file and prompt"""
-    get_or_404(db, CSVFile, csv_id, "CSV file not found")
+    exists_or_404(db, CSVFile, csv_id, "CSV file not found")
     
-    results = db.query(JudgeResult).filter(
+    results = db.query(JudgeResult).options(raiseload('*')).filter(
         JudgeResult.csv_file_id == csv_id,
         JudgeResult.prompt_id == prompt_id
     ).all()
@@ -155,19 +161,27 @@ async def get_judge_results_for_csv(
 
 
 @router.post("/run", response_model=JudgeResultResponse)
-async def run_judge(
-    request: JudgeRunRequest,
-    db: Session = Depends(get_db)
-) -> JudgeResultResponse:
+async def run_judge(request: JudgeRunRequest) -> JudgeResultResponse:
     """
     Run a judge evaluation for a specific CSV row.
     Builds the judge prompt, calls the LLM, parses the score, and stores the result.
     """
+    key = (request.config_id, request.csv_row_id, request.prompt_id)
+    return await _judge_runs.do(key, lambda: _run_judge(request))
+
+
+def _prepare_judge(db: Session, request: JudgeRunRequest) -> Tuple[JudgeConfig, Dict[str, Any], str, Tuple[str, ...], int]:
+    """
+    Load and validate everything a judge run needs from the database.
+    
+    Returns:
+        Tuple of (judge config, row data, output to judge, available columns, csv_file_id)
+    """
     # Get judge config
     config = get_or_404(db, JudgeConfig, request.config_id, "Judge config not found")
     
-    # Get CSV row
-    csv_row = get_or_404(db, CSVRow, request.csv_row_id, "CSV row not found")
+    # Get CSV row and its CSV file (for column names) in one query
+    csv_row, csv_file = get_row_with_file_or_404(db, request.csv_row_id)
     
     # Verify row belongs to the same CSV file as the config
     if csv_row.csv_file_id != config.csv_file_id:
@@ -176,9 +190,6 @@ async def run_judge(
             detail="CSV row does not belong to the same CSV file as the judge config"
         )
     
-    # Get CSV file to access column names
-    csv_file = get_or_404(db, CSVFile, csv_row.csv_file_id, "CSV file not found")
-    
     # Parse row data
     row_data = parse_json_safe(csv_row.row_data, {})
     if not row_data:
@@ -193,7 +204,65 @@ async def run_judge(
     output = evaluation.output if evaluation and evaluation.output else ""
     
     # Parse CSV file columns
-    available_columns = parse_json_safe(csv_file.columns, None) or []
+    available_columns, _ = parse_columns(csv_file.columns)
+    
+    return config, row_data, output, available_columns, csv_row.csv_file_id
+
+
+def _save_judge_result(
+    db: Session,
+    request: JudgeRunRequest,
+    csv_file_id: int,
+    score: float,
+    raw_output: str
+) -> JudgeResultResponse:
+    """Upsert the judge result for the run and return it"""
+    # Verify prompt exists
+    from app.models.prompt import Prompt
+    exists_or_404(db, Prompt, request.prompt_id, "Prompt not found")
+    
+    try:
+        # Get or create judge result (upsert)
+        result = upsert_returning(
+            db,
+            JudgeResult,
+            match={
+                "config_id": request.config_id,
+                "csv_row_id": request.csv_row_id,
+                "prompt_id": request.prompt_id,
+            },
+            values={"score": score, "raw_output": raw_output},
+            insert_values={"csv_file_id": csv_file_id},
+        )
+        # Serialize before commit so the response doesn't reload the expired row
+        response = JudgeResultResponse.model_validate(result)
+        db.commit()
+        return response
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error saving judge result: {str(e)}")
+
+
+async def _run_judge(request: JudgeRunRequest) -> JudgeResultResponse:
+    """
+    Run and persist a single judge evaluation (see run_judge).
+    
+    The run is shared by every concurrent request for the same key and can outlive
+    the request that started it, so it uses its own session rather than a request's.
+    """
+    db = SessionLocal()
+    try:
+        return await _run_judge_with_session(request, db)
+    finally:
+        await run_in_threadpool(db.close)
+
+
+async def _run_judge_with_session(request: JudgeRunRequest, db: Session) -> JudgeResultResponse:
+    """Body of _run_judge, given the run's session"""
+    # Database work runs in the threadpool so the sync Session doesn't block the event loop
+    config, row_data, output, available_columns, csv_file_id = await run_in_threadpool(
+        _prepare_judge, db, request
+    )
     
     # Run judge evaluation with retries
     raw_output = None
@@ -202,6 +271,8 @@ async def run_judge(
     
     for attempt in range(max_retries):
         try:
+            # Unparseable replies are never cached, so a retry makes a fresh call
+            # and a good reply is cached for later runs
             score, raw_output = await run_judge_evaluation(
                 config,
                 row_data,
@@ -219,8 +290,9 @@ async def run_judge(
                     detail=f"Failed to parse score from LLM output after {max_retries} attempts: {str(e)}"
                 )
         except Exception as e:
-            # LLM call failed - retry if we have attempts left
+            # LLM call failed - back off and retry if we have attempts left
             if attempt < max_retries - 1:
+                await asyncio.sleep(retry_backoff_delay(attempt))
                 continue
             else:
                 raise HTTPException(
@@ -228,46 +300,11 @@ async def run_judge(
                     detail=f"Error calling LLM after {max_retries} attempts: {str(e)}"
                 )
     
-    # Verify prompt exists
-    from app.models.prompt import Prompt
-    get_or_404(db, Prompt, request.prompt_id, "Prompt not found")
-    
-    # Get or create judge result (upsert)
-    result = db.query(JudgeResult).filter(
-        and_(
-            JudgeResult.config_id == config.id,
-            JudgeResult.csv_row_id == request.csv_row_id,
-            JudgeResult.prompt_id == request.prompt_id
-        )
-    ).first()
-    
-    if result:
-        # Update existing result
-        result.score = score
-        result.raw_output = raw_output
-    else:
-        # Create new result
-        result = JudgeResult(
-            config_id=config.id,
-            csv_file_id=csv_row.csv_file_id,
-            csv_row_id=request.csv_row_id,
-            prompt_id=request.prompt_id,
-            score=score,
-            raw_output=raw_output
-        )
-        db.add(result)
-    
-    try:
-        db.commit()
-        db.refresh(result)
-        return result
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error saving judge result: {str(e)}")
+    return await run_in_threadpool(_save_judge_result, db, request, csv_file_id, score, raw_output)
 
 
 @router.delete("/results/config/{config_id}/row/{row_id}")
-async def delete_judge_result(
+def delete_judge_result(
     config_id: int,
     row_id: int,
     prompt_id: int,
@@ -290,13 +327,13 @@ async def delete_judge_result(
 
 
 @router.delete("/results/config/{config_id}")
-async def delete_judge_results_for_config(
+def delete_judge_results_for_config(
     config_id: int,
     prompt_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ) -> dict[str, str | int]:
     """Delete all judge results for a specific config"""
-    get_or_404(db, JudgeConfig, config_id, "Judge config not found")
+    exists_or_404(db, JudgeConfig, config_id, "Judge config not found")
     
     query = db.query(JudgeResult).filter(
         JudgeResult.config_id == config_id
@@ -305,7 +342,7 @@ async def delete_judge_results_for_config(
     # If prompt_id is provided, only delete results for that prompt version
     if prompt_id is not None:
         from app.models.prompt import Prompt
-        get_or_404(db, Prompt, prompt_id, "Prompt not found")
+        exists_or_404(db, Prompt, prompt_id, "Prompt not found")
         query = query.filter(JudgeResult.prompt_id == prompt_id)
     
     deleted_count = query.delete()
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Tuple, List, Union, Any, AsyncIterator
 from pydantic import BaseModel
 
 from app.database import get_db
 from app.models.prompt import Prompt
 from app.models.csv_data import CSVRow, CSVFile
 from app.models.evaluation import Evaluation
-from app.services.llm_service import llm_service
-from app.utils import parse_json_safe, get_or_404
+from app.services.llm_service import llm_service, retry_backoff_delay
+from app.services.llm_cache import llm_cache
+from app.services.prompt_cache import get_prompt_template_or_404
+from app.utils import parse_json_safe, parse_columns, get_row_with_file_or_404, upsert_returning
 from app.schemas.evaluation import EvaluationResponse
 
 
@@ -25,48 +31,89 @@ class RunPromptRequest(BaseModel):
     user_message_column: Optional[str] = None  # Optional override for user message column (for unsaved edits)
 
 
-@router.post("/run", response_model=EvaluationResponse)
-async def run_prompt(
+class BatchRunRequest(BaseModel):
+    items: List[RunPromptRequest]
+
+
+class BatchRunResult(BaseModel):
+    prompt_id: int
+    csv_row_id: int
+    evaluation: Optional[EvaluationResponse] = None
+    error: Optional[str] = None
+
+
+class CacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+    ttl_seconds: float
+
+
+# Fields of EvaluationResponse, serialized directly for the single-run hot path
+_EVALUATION_FIELDS = tuple(EvaluationResponse.model_fields)
+
+
+def _evaluation_json(evaluation: Evaluation) -> bytes:
+    """Serialize an evaluation with the EvaluationResponse shape, skipping model validation"""
+    return orjson.dumps({field: getattr(evaluation, field) for field in _EVALUATION_FIELDS})
+
+
+# Server-sent event framing for /run/stream
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+
+def _sse_frame(payload: Any) -> bytes:
+    """Encode a payload as a single SSE data frame"""
+    return _SSE_PREFIX + orjson.dumps(payload) + _SSE_SUFFIX
+
+
+# Upper bound on LLM calls a single batch keeps in flight at once
+BATCH_MAX_CONCURRENT_REQUESTS = 32
+
+
+def _build_messages(
     request: RunPromptRequest,
-    db: Session = Depends(get_db)
-) -> EvaluationResponse:
+    template: Tuple[Optional[str], Optional[str]],
+    csv_row: CSVRow,
+    csv_file: CSVFile,
+) -> Tuple[str, str]:
     """
-    Run a prompt through an LLM for a specific CSV row.
-    Returns the complete response and saves it to the evaluation output.
-    """
-    # Verify prompt exists (still needed for validation even if using overrides)
-    prompt = get_or_404(db, Prompt, request.prompt_id, "Prompt not found")
+    Render the system prompt and pick the user message for one row.
+    
+    template is the prompt's saved (system_prompt, user_message_column).
     
+    Returns:
+        Tuple of (rendered system prompt, user message)
+    """
     # Use provided overrides if available, otherwise use saved prompt values
-    system_prompt = request.system_prompt if request.system_prompt is not None else prompt.system_prompt
-    user_message_column = request.user_message_column if request.user_message_column is not None else prompt.user_message_column
+    saved_system_prompt, saved_user_message_column = template
+    system_prompt = request.system_prompt if request.system_prompt is not None else saved_system_prompt
+    user_message_column = request.user_message_column if request.user_message_column is not None else saved_user_message_column
     
     if not system_prompt:
         raise HTTPException(status_code=400, detail="System prompt is required")
     
-    # Verify CSV row exists
-    csv_row = get_or_404(db, CSVRow, request.csv_row_id, "CSV row not found")
-    
-    # Get CSV file to access column names for validation
-    csv_file = get_or_404(db, CSVFile, csv_row.csv_file_id, "CSV file not found")
-    
     # Parse row data
     row_data = parse_json_safe(csv_row.row_data, {})
     if not row_data:
         raise HTTPException(status_code=400, detail="Invalid row data format")
     
-    # Parse CSV file columns
-    available_columns = parse_json_safe(csv_file.columns, None)
+    # Parse CSV file columns (ordered names for messages, set for membership checks)
+    available_columns, available_column_set = parse_columns(csv_file.columns)
     
     # Render the system prompt template with row data and validate column names
     try:
-        rendered_system_prompt = llm_service.render_prompt(system_prompt, row_data, available_columns)
+        rendered_system_prompt = llm_service.render_prompt(
+            system_prompt, row_data, available_columns or None
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Error rendering system prompt: {str(e)}")
     
     # Get user message from the specified column
     if user_message_column:
-        if available_columns and user_message_column not in available_columns:
+        if available_columns and user_message_column not in available_column_set:
             raise HTTPException(
                 status_code=400,
                 detail=f"User message column '{user_message_column}' not found. Available columns: {', '.join(available_columns)}"
@@ -81,24 +128,120 @@ async def run_prompt(
         # If no user message column is specified, use empty string
         user_message = ""
     
-    # Get or create evaluation
-    evaluation = db.query(Evaluation).filter(
-        Evaluation.csv_row_id == request.csv_row_id,
-        Evaluation.prompt_id == request.prompt_id
-    ).first()
-    
-    if not evaluation:
-        evaluation = Evaluation(
-            csv_file_id=csv_row.csv_file_id,
-            csv_row_id=request.csv_row_id,
-            prompt_id=request.prompt_id,
-            output="",
+    return rendered_system_prompt, user_message
+
+
+def _prepare_run(db: Session, request: RunPromptRequest) -> Tuple[str, str, int]:
+    """
+    Load and validate everything run_prompt needs from the database.
+    
+    Returns:
+        Tuple of (rendered system prompt, user message, csv_file_id)
+    """
+    # Verify prompt exists (still needed for validation even if using overrides)
+    template = get_prompt_template_or_404(db, request.prompt_id)
+    
+    # Verify CSV row exists and get its CSV file (for column validation) in one query
+    csv_row, csv_file = get_row_with_file_or_404(db, request.csv_row_id)
+    
+    rendered_system_prompt, user_message = _build_messages(request, template, csv_row, csv_file)
+    return rendered_system_prompt, user_message, csv_row.csv_file_id
+
+
+def _prepare_batch(
+    db: Session,
+    items: List[RunPromptRequest],
+) -> List[Union[Tuple[str, str, int], HTTPException]]:
+    """
+    Load and validate every batch item, fetching prompts and rows with one query each.
+    
+    Returns one entry per item: (rendered system prompt, user message, csv_file_id),
+    or the HTTPException explaining why that item can't run.
+    """
+    prompt_ids = {item.prompt_id for item in items}
+    row_ids = {item.csv_row_id for item in items}
+    
+    templates = {
+        prompt_id: (system_prompt, user_message_column)
+        for prompt_id, system_prompt, user_message_column in (
+            db.query(Prompt.id, Prompt.system_prompt, Prompt.user_message_column)
+            .filter(Prompt.id.in_(prompt_ids))
+            .all()
+        )
+    }
+    rows = {
+        csv_row.id: (csv_row, csv_file)
+        for csv_row, csv_file in (
+            db.query(CSVRow, CSVFile)
+            .outerjoin(CSVFile, CSVFile.id == CSVRow.csv_file_id)
+            .filter(CSVRow.id.in_(row_ids))
+            .all()
         )
-        db.add(evaluation)
-        db.commit()
-        db.refresh(evaluation)
+    }
     
-    # Get completion from LLM with retries using chat format
+    prepared = []
+    for item in items:
+        try:
+            template = templates.get(item.prompt_id)
+            if template is None:
+                raise HTTPException(status_code=404, detail="Prompt not found")
+            if item.csv_row_id not in rows:
+                raise HTTPException(status_code=404, detail="CSV row not found")
+            csv_row, csv_file = rows[item.csv_row_id]
+            if csv_file is None:
+                raise HTTPException(status_code=404, detail="CSV file not found")
+            
+            rendered_system_prompt, user_message = _build_messages(item, template, csv_row, csv_file)
+            prepared.append((rendered_system_prompt, user_message, csv_row.csv_file_id))
+        except HTTPException as e:
+            prepared.append(e)
+    
+    return prepared
+
+
+def _save_output(db: Session, request: RunPromptRequest, csv_file_id: int, output: str) -> bytes:
+    """Save the LLM output to the row's evaluation and return it as JSON"""
+    # Get or create evaluation, keeping annotation/feedback
+    evaluation = upsert_returning(
+        db,
+        Evaluation,
+        match={"csv_row_id": request.csv_row_id, "prompt_id": request.prompt_id},
+        values={"output": output},
+        insert_values={"csv_file_id": csv_file_id},
+    )
+    # Serialize before commit so the response doesn't reload the expired row
+    response = _evaluation_json(evaluation)
+    db.commit()
+    
+    return response
+
+
+def _save_outputs(
+    db: Session,
+    runs: List[Tuple[RunPromptRequest, int, str]],
+) -> List[EvaluationResponse]:
+    """Save a batch of (request, csv_file_id, output) runs in a single transaction"""
+    responses = []
+    for request, csv_file_id, output in runs:
+        evaluation = upsert_returning(
+            db,
+            Evaluation,
+            match={"csv_row_id": request.csv_row_id, "prompt_id": request.prompt_id},
+            values={"output": output},
+            insert_values={"csv_file_id": csv_file_id},
+        )
+        responses.append(EvaluationResponse.model_validate(evaluation))
+    db.commit()
+    
+    return responses
+
+
+async def _complete_with_retries(
+    request: RunPromptRequest,
+    rendered_system_prompt: str,
+    user_message: str,
+) -> str:
+    """Get a chat completion for a prepared run, retrying failed LLM calls"""
     output = None
     max_retries = 3
     
@@ -116,12 +259,11 @@ async def run_prompt(
             break
             
         except Exception as e:
-            # LLM call failed - retry if we have attempts left
+            # LLM call failed - back off and retry if we have attempts left
             if attempt < max_retries - 1:
+                await asyncio.sleep(retry_backoff_delay(attempt))
                 continue
             else:
-                # Rollback on final failure
-                db.rollback()
                 raise HTTPException(
                     status_code=500,
                     detail=f"Error calling LLM after {max_retries} attempts: {str(e)}"
@@ -129,16 +271,138 @@ async def run_prompt(
     
     # Ensure we have valid output
     if output is None:
-        db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get valid LLM output after {max_retries} attempts"
         )
     
-    # Save the output to the database
-    evaluation.output = output if output else ""
-    db.commit()
-    db.refresh(evaluation)
+    return output if output else ""
+
+
+@router.post(
+    "/run",
+    response_class=Response,
+    responses={200: {"model": EvaluationResponse, "content": {"application/json": {}}}},
+)
+async def run_prompt(
+    request: RunPromptRequest,
+    db: Session = Depends(get_db)
+) -> Response:
+    """
+    Run a prompt through an LLM for a specific CSV row.
+    Returns the complete response and saves it to the evaluation output.
+    """
+    # Database work runs in the threadpool so the sync Session doesn't block the event loop
+    rendered_system_prompt, user_message, csv_file_id = await run_in_threadpool(_prepare_run, db, request)
+    
+    # Get completion from LLM with retries using chat format
+    output = await _complete_with_retries(request, rendered_system_prompt, user_message)
+    
+    # Save the output to the database; outputs can be large, so the response is
+    # serialized straight from the row rather than validated through Pydantic
+    content = await run_in_threadpool(_save_output, db, request, csv_file_id, output)
+    return Response(content=content, media_type="application/json")
+
+
+@router.post("/run/stream")
+async def run_prompt_stream(
+    request: RunPromptRequest,
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Run a prompt for a CSV row, streaming the output as server-sent events.
+    
+    Emits {"delta": text} frames as tokens arrive. Once the completion finishes
+    the output is saved like /run and a final {"evaluation": ...} frame carries
+    the saved evaluation; a failure emits {"error": message} instead and nothing
+    is saved.
+    """
+    # Validate before streaming so bad requests still get a proper HTTP error
+    rendered_system_prompt, user_message, csv_file_id = await run_in_threadpool(_prepare_run, db, request)
+    
+    async def event_generator() -> AsyncIterator[bytes]:
+        chunks = []
+        try:
+            async for delta in llm_service.stream_chat_completion(
+                system_prompt=rendered_system_prompt,
+                user_message=user_message,
+                model=request.model,
+                temperature=request.temperature,
+                max_completion_tokens=request.max_tokens,
+            ):
+                chunks.append(delta)
+                yield _sse_frame({"delta": delta})
+            
+            content = await run_in_threadpool(_save_output, db, request, csv_file_id, "".join(chunks).strip())
+        except Exception as e:
+            yield _sse_frame({"error": f"Error calling LLM: {str(e)}"})
+            return
+        
+        yield _sse_frame({"evaluation": orjson.Fragment(content)})
     
-    return evaluation
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@router.post("/run/batch", response_model=List[BatchRunResult])
+async def run_prompt_batch(
+    request: BatchRunRequest,
+    db: Session = Depends(get_db)
+) -> List[BatchRunResult]:
+    """
+    Run many prompt/row pairs through the LLM concurrently.
+    Results come back in request order; an item that fails carries an error
+    instead of an evaluation without failing the rest of the batch.
+    """
+    items = request.items
+    prepared = await run_in_threadpool(_prepare_batch, db, items)
+    
+    # LLM calls are I/O-bound, so run them together up to the concurrency cap
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENT_REQUESTS)
+    
+    async def run_one(item: RunPromptRequest, run: Union[Tuple[str, str, int], HTTPException]) -> str:
+        if isinstance(run, HTTPException):
+            raise run
+        rendered_system_prompt, user_message, _ = run
+        async with semaphore:
+            return await _complete_with_retries(item, rendered_system_prompt, user_message)
+    
+    outputs = await asyncio.gather(
+        *(run_one(item, run) for item, run in zip(items, prepared)),
+        return_exceptions=True,
+    )
+    
+    # Persist every successful output in one transaction
+    succeeded = [
+        (item, run[2], output)
+        for item, run, output in zip(items, prepared, outputs)
+        if not isinstance(output, BaseException)
+    ]
+    saved = await run_in_threadpool(_save_outputs, db, succeeded) if succeeded else []
+    evaluations = iter(saved)
+    
+    results = []
+    for item, output in zip(items, outputs):
+        result = BatchRunResult(prompt_id=item.prompt_id, csv_row_id=item.csv_row_id)
+        if isinstance(output, HTTPException):
+            result.error = str(output.detail)
+        elif isinstance(output, BaseException):
+            result.error = str(output)
+        else:
+            result.evaluation = next(evaluations)
+        results.append(result)
+    
+    return results
+
 
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+def get_cache_stats() -> CacheStatsResponse:
+    """Get hit/miss statistics for the LLM response cache"""
+    return CacheStatsResponse(**llm_cache.stats())
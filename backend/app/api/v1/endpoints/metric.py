@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, cast, Float
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import func, cast, select, Float, ColumnElement
 from typing import List, Optional, Dict, Tuple
+from collections import defaultdict
 
 from app.database import get_db
 from app.models.metric import Metric
@@ -10,214 +12,297 @@ from app.models.judge import JudgeResult, JudgeConfig
 from app.models.function_eval import FunctionEvalResult, FunctionEvalConfig
 from app.models.evaluation import Evaluation
 from app.models.prompt import Prompt
-from app.utils import get_or_404
+from app.utils import get_or_404, exists_or_404, upsert_returning, update_returning, etag_response, TTLCache
 from app.schemas.metric import (
     MetricResponse, 
     CreateMetricRequest, 
     UpdateMetricRequest,
     BestPromptsResponse,
-    BestPromptInfo
+    BestPromptInfo,
+    BestPromptConfigEntry
 )
 
 router = APIRouter()
 
+# Serialized metric lists per CSV file, invalidated by every metric write below (and CSV deletion)
+_metrics_cache = TTLCache(maxsize=1024, ttl=30)
+_metric_list_adapter = TypeAdapter(List[MetricResponse])
 
-def _find_best_prompt(db: Session, prompt_scores: List[Tuple[int, float, int]]) -> Optional[BestPromptInfo]:
+
+def invalidate_metrics_cache(csv_file_id: int) -> None:
+    """Drop the cached metric list for a CSV file"""
+    _metrics_cache.pop(csv_file_id)
+
+
+def _find_best_prompt(prompt_scores: List[Tuple[int, float, int]]) -> Optional[Tuple[int, float, int]]:
     """
-    Helper function to find the best prompt from a list of (prompt_id, avg_score, count).
+    Helper function to find the best (prompt_id, avg_score, count) from a list of them.
     Prefers higher score, then higher prompt_id (more recent).
     """
     if not prompt_scores:
         return None
+    
+    # max() runs the comparison loop in C; None scores count as 0.0
+    best_prompt_id, best_avg_score, best_result_count = max(
+        prompt_scores,
+        key=lambda row: (float(row[1] or 0.0), row[0])
+    )
+    return best_prompt_id, float(best_avg_score or 0.0), best_result_count
 
-    best_prompt_id = None
-    best_avg_score = -1.0
-    best_result_count = 0
+
+def _supports_window_functions(db: Session) -> bool:
+    """ROW_NUMBER() OVER needs SQLite 3.25+; the other supported backends always have it"""
+    dialect = db.get_bind().dialect
+    if dialect.name != "sqlite":
+        return True
+    return dialect.dbapi.sqlite_version_info >= (3, 25, 0)
+
+
+def _best_prompts(
+    db: Session,
+    partition_column: ColumnElement,
+    prompt_column: ColumnElement,
+    score_expression: ColumnElement,
+    id_column: ColumnElement,
+    filters: List[ColumnElement]
+) -> Dict[int, BestPromptInfo]:
+    """
+    Find the best prompt per partition (e.g. per judge config) in a single statement.
     
-    for prompt_id, avg_score, result_count in prompt_scores:
-        # Handle potential None values or type mismatches
-        current_score = float(avg_score) if avg_score is not None else 0.0
+    Averages scores per (partition, prompt), ranks prompts within each partition with
+    ROW_NUMBER() by score then prompt_id (more recent wins ties), and joins the winners
+    to Prompt. Partitions without any results are absent from the returned dict.
+    """
+    avg_score = func.avg(score_expression)
+    result_count = func.count(id_column)
+    
+    if not _supports_window_functions(db):
+        # Fallback: pick winners in Python, then load them with one IN query
+        grouped_scores = db.query(
+            partition_column, prompt_column, avg_score, result_count
+        ).filter(*filters).group_by(partition_column, prompt_column).all()
+        
+        scores_by_partition: Dict[int, List[Tuple[int, float, int]]] = defaultdict(list)
+        for partition_id, prompt_id, score, count in grouped_scores:
+            scores_by_partition[partition_id].append((prompt_id, score, count))
+        winners = {
+            partition_id: _find_best_prompt(scores)
+            for partition_id, scores in scores_by_partition.items()
+        }
+        
+        winning_ids = {winner[0] for winner in winners.values() if winner}
+        prompts_by_id = {
+            prompt.id: prompt
+            for prompt in db.query(Prompt).filter(Prompt.id.in_(winning_ids)).all()
+        } if winning_ids else {}
         
-        if current_score > best_avg_score or (current_score == best_avg_score and prompt_id > best_prompt_id):
-            best_prompt_id = prompt_id
-            best_avg_score = current_score
-            best_result_count = result_count
+        best: Dict[int, BestPromptInfo] = {}
+        for partition_id, winner in winners.items():
+            if winner and winner[0] in prompts_by_id:
+                prompt = prompts_by_id[winner[0]]
+                best[partition_id] = BestPromptInfo(
+                    id=prompt.id,
+                    name=prompt.name,
+                    version=prompt.version,
+                    average_score=winner[1],
+                    result_count=winner[2]
+                )
+        return best
     
-    if best_prompt_id:
-        prompt = db.query(Prompt).filter(Prompt.id == best_prompt_id).first()
-        if prompt:
-            return BestPromptInfo(
-                id=prompt.id,
-                name=prompt.name,
-                version=prompt.version,
-                average_score=best_avg_score,
-                result_count=best_result_count
-            )
+    ranked = select(
+        partition_column.label('partition_id'),
+        prompt_column.label('prompt_id'),
+        avg_score.label('avg_score'),
+        result_count.label('result_count'),
+        func.row_number().over(
+            partition_by=partition_column,
+            order_by=[avg_score.desc(), prompt_column.desc()]
+        ).label('rn')
+    ).where(*filters).group_by(partition_column, prompt_column).subquery()
+    
+    rows = db.execute(
+        select(
+            ranked.c.partition_id,
+            ranked.c.avg_score,
+            ranked.c.result_count,
+            Prompt.id,
+            Prompt.name,
+            Prompt.version
+        ).select_from(ranked).join(Prompt, Prompt.id == ranked.c.prompt_id).where(ranked.c.rn == 1)
+    ).all()
     
-    return None
+    return {
+        row.partition_id: BestPromptInfo(
+            id=row.id,
+            name=row.name,
+            version=row.version,
+            average_score=float(row.avg_score) if row.avg_score is not None else 0.0,
+            result_count=row.result_count
+        )
+        for row in rows
+    }
 
 
 @router.get("/csv/{csv_file_id}/metrics", response_model=List[MetricResponse])
-async def list_metrics(
+def list_metrics(
     csv_file_id: int,
+    request: Request,
     db: Session = Depends(get_db)
-) -> List[MetricResponse]:
-    """List all metrics for a CSV file"""
+) -> Response:
+    """List all metrics for a CSV file (with an ETag, so unchanged polls get a 304)"""
+    content = _metrics_cache.get(csv_file_id)
+    if content is not None:
+        return etag_response(request, content)
+    
     # Verify CSV file exists
-    get_or_404(db, CSVFile, csv_file_id, "CSV file not found")
+    exists_or_404(db, CSVFile, csv_file_id, "CSV file not found")
     
-    metrics = db.query(Metric).filter(Metric.csv_file_id == csv_file_id).all()
-    return metrics
+    # raiseload: response models only use columns, so any relationship access is a bug (N+1)
+    metrics = db.query(Metric).options(raiseload('*')).filter(Metric.csv_file_id == csv_file_id).all()
+    content = _metric_list_adapter.dump_json(_metric_list_adapter.validate_python(metrics))
+    _metrics_cache.set(csv_file_id, content)
+    return etag_response(request, content)
 
 
 @router.post("/metrics", response_model=MetricResponse)
-async def create_metric(
+def create_metric(
     request: CreateMetricRequest,
     db: Session = Depends(get_db)
-) -> MetricResponse:
-    """Create or update a metric threshold"""
+) -> Response:
+    """Create or update a metric threshold (serialized directly, skipping response_model re-validation)"""
     # Verify CSV file exists
-    get_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
-    
-    # Check if metric already exists
-    existing_metric = db.query(Metric).filter(
-        Metric.csv_file_id == request.csv_file_id,
-        Metric.metric_type == request.metric_type,
-        Metric.config_id == request.config_id
-    ).first()
-    
-    if existing_metric:
-        # Update existing metric
-        existing_metric.threshold = request.threshold
-        db.commit()
-        db.refresh(existing_metric)
-        return existing_metric
-    else:
-        # Create new metric
-        metric = Metric(
-            csv_file_id=request.csv_file_id,
-            metric_type=request.metric_type,
-            config_id=request.config_id,
-            threshold=request.threshold
-        )
-        db.add(metric)
-        db.commit()
-        db.refresh(metric)
-        return metric
+    exists_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
+    
+    # Create the metric, or update the threshold of the existing one
+    metric = upsert_returning(
+        db,
+        Metric,
+        match={
+            "csv_file_id": request.csv_file_id,
+            "metric_type": request.metric_type,
+            "config_id": request.config_id,
+        },
+        values={"threshold": request.threshold},
+    )
+    # Serialize before commit so the response doesn't reload the expired row
+    content = MetricResponse.model_validate(metric).model_dump_json()
+    db.commit()
+    invalidate_metrics_cache(request.csv_file_id)
+    
+    return Response(content=content, media_type="application/json")
 
 
 @router.put("/metrics/{metric_id}", response_model=MetricResponse)
-async def update_metric(
+def update_metric(
     metric_id: int,
     request: UpdateMetricRequest,
     db: Session = Depends(get_db)
-) -> MetricResponse:
-    """Update a metric threshold"""
-    metric = get_or_404(db, Metric, metric_id, "Metric not found")
+) -> Response:
+    """Update a metric threshold (serialized directly, skipping response_model re-validation)"""
+    metric = update_returning(db, Metric, {"id": metric_id}, {"threshold": request.threshold})
+    if metric is None:
+        raise HTTPException(status_code=404, detail="Metric not found")
     
-    metric.threshold = request.threshold
+    response = MetricResponse.model_validate(metric)
     db.commit()
-    db.refresh(metric)
-    return metric
+    invalidate_metrics_cache(response.csv_file_id)
+    return Response(content=response.model_dump_json(), media_type="application/json")
 
 
 @router.delete("/metrics/{metric_id}")
-async def delete_metric(
+def delete_metric(
     metric_id: int,
     db: Session = Depends(get_db)
-):
+) -> dict[str, str]:
     """Delete a metric"""
     metric = get_or_404(db, Metric, metric_id, "Metric not found")
     
+    csv_file_id = metric.csv_file_id
     db.delete(metric)
     db.commit()
+    invalidate_metrics_cache(csv_file_id)
     return {"message": "Metric deleted successfully"}
 
 
 @router.delete("/csv/{csv_file_id}/metrics")
-async def delete_all_metrics(
+def delete_all_metrics(
     csv_file_id: int,
     db: Session = Depends(get_db)
-):
+) -> dict[str, str]:
     """Delete all metrics for a CSV file"""
     # Verify CSV file exists
-    get_or_404(db, CSVFile, csv_file_id, "CSV file not found")
+    exists_or_404(db, CSVFile, csv_file_id, "CSV file not found")
     
     db.query(Metric).filter(Metric.csv_file_id == csv_file_id).delete()
     db.commit()
+    invalidate_metrics_cache(csv_file_id)
     return {"message": "All metrics deleted successfully"}
 
 
 @router.get("/metrics/{csv_file_id}/best-prompts", response_model=BestPromptsResponse)
-async def get_best_prompts_for_metrics(
+def get_best_prompts_for_metrics(
     csv_file_id: int,
     db: Session = Depends(get_db)
-) -> BestPromptsResponse:
-    """Get the best-performing prompt version for human annotations, each judge config, and each function eval config"""
+) -> Response:
+    """
+    Get the best-performing prompt version for human annotations, each judge config, and each function eval config.
+    
+    The response is built already validated, so it is serialized straight to JSON
+    instead of going through response_model validation again.
+    """
     # Verify CSV file exists
-    get_or_404(db, CSVFile, csv_file_id, "CSV file not found")
-    
-    # Initialize response dictionaries
-    human_annotation_best: Optional[BestPromptInfo] = None
-    judge_configs_best: Dict[int, Optional[BestPromptInfo]] = {}
-    function_eval_configs_best: Dict[int, Optional[BestPromptInfo]] = {}
-    
-    # Calculate best prompt for human annotations
-    prompt_annotation_scores = db.query(
-        Evaluation.prompt_id,
-        func.avg(cast(Evaluation.annotation, Float)).label('avg_score'),
-        func.count(Evaluation.id).label('result_count')
-    ).filter(
-        and_(
+    exists_or_404(db, CSVFile, csv_file_id, "CSV file not found")
+    
+    # Calculate best prompt for human annotations (a single partition: this CSV file)
+    human_annotation_best = _best_prompts(
+        db,
+        partition_column=Evaluation.csv_file_id,
+        prompt_column=Evaluation.prompt_id,
+        score_expression=cast(Evaluation.annotation, Float),
+        id_column=Evaluation.id,
+        filters=[
             Evaluation.csv_file_id == csv_file_id,
             Evaluation.annotation.isnot(None)  # Only count evaluations with annotations
-        )
-    ).group_by(Evaluation.prompt_id).all()
+        ]
+    ).get(csv_file_id)
     
-    human_annotation_best = _find_best_prompt(db, prompt_annotation_scores)
-    
-    # Get all judge configs for this CSV file
-    judge_configs = db.query(JudgeConfig).filter(
+    # Best prompt for every judge config (None for configs without results)
+    judge_config_ids = [row.id for row in db.query(JudgeConfig.id).filter(
         JudgeConfig.csv_file_id == csv_file_id
-    ).all()
-    
-    # For each judge config, find the best prompt
-    for config in judge_configs:
-        prompt_scores = db.query(
-            JudgeResult.prompt_id,
-            func.avg(JudgeResult.score).label('avg_score'),
-            func.count(JudgeResult.id).label('result_count')
-        ).filter(
-            and_(
-                JudgeResult.config_id == config.id,
-                JudgeResult.csv_file_id == csv_file_id
-            )
-        ).group_by(JudgeResult.prompt_id).all()
-        
-        judge_configs_best[config.id] = _find_best_prompt(db, prompt_scores)
+    ).all()]
+    judge_best = _best_prompts(
+        db,
+        partition_column=JudgeResult.config_id,
+        prompt_column=JudgeResult.prompt_id,
+        score_expression=JudgeResult.score,
+        id_column=JudgeResult.id,
+        filters=[JudgeResult.csv_file_id == csv_file_id]
+    )
+    judge_configs_best = [
+        BestPromptConfigEntry(config_id=config_id, info=judge_best.get(config_id))
+        for config_id in judge_config_ids
+    ]
     
-    # Get all function eval configs for this CSV file
-    function_eval_configs = db.query(FunctionEvalConfig).filter(
+    # Same for every function eval config
+    function_eval_config_ids = [row.id for row in db.query(FunctionEvalConfig.id).filter(
         FunctionEvalConfig.csv_file_id == csv_file_id
-    ).all()
-    
-    # For each function eval config, find the best prompt
-    for config in function_eval_configs:
-        prompt_scores = db.query(
-            FunctionEvalResult.prompt_id,
-            func.avg(FunctionEvalResult.score).label('avg_score'),
-            func.count(FunctionEvalResult.id).label('result_count')
-        ).filter(
-            and_(
-                FunctionEvalResult.config_id == config.id,
-                FunctionEvalResult.csv_file_id == csv_file_id
-            )
-        ).group_by(FunctionEvalResult.prompt_id).all()
-        
-        function_eval_configs_best[config.id] = _find_best_prompt(db, prompt_scores)
+    ).all()]
+    function_eval_best = _best_prompts(
+        db,
+        partition_column=FunctionEvalResult.config_id,
+        prompt_column=FunctionEvalResult.prompt_id,
+        score_expression=FunctionEvalResult.score,
+        id_column=FunctionEvalResult.id,
+        filters=[FunctionEvalResult.csv_file_id == csv_file_id]
+    )
+    function_eval_configs_best = [
+        BestPromptConfigEntry(config_id=config_id, info=function_eval_best.get(config_id))
+        for config_id in function_eval_config_ids
+    ]
     
-    return BestPromptsResponse(
+    response = BestPromptsResponse(
         human_annotation=human_annotation_best,
         judge_configs=judge_configs_best,
         function_eval_configs=function_eval_configs_best
     )
+    return Response(content=response.model_dump_json(), media_type="application/json")
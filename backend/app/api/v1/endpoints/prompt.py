@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
-from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, Query, defer
+from sqlalchemy import exists, func
+from typing import List, Optional, Dict, Union
 
 from app.database import get_db
 from app.models.prompt import Prompt
 from app.models.csv_data import CSVFile
-from app.utils import get_root_prompt_id, get_next_prompt_version, get_or_404
+from app.models.gepa import GepaConfig
+from app.utils import get_root_prompt_id, get_root_and_next_version, get_or_404, exists_or_404, insert_returning
+from app.services.prompt_cache import cached_prompt_response, invalidate_prompt_cache
 from app.schemas.prompt import (
     PromptResponse,
+    PromptSummaryResponse,
     CreatePromptRequest,
     UpdatePromptRequest,
     CreateVersionRequest
@@ -16,29 +20,47 @@ from app.schemas.prompt import (
 
 router = APIRouter()
 
+# Built once: validating a whole list through one adapter stays inside pydantic-core
+_prompt_list_adapter = TypeAdapter(List[PromptResponse])
+_prompt_summary_list_adapter = TypeAdapter(List[PromptSummaryResponse])
+
+
+def _list_prompts(query: Query, summary: bool) -> Union[List[PromptResponse], List[PromptSummaryResponse]]:
+    """
+    Run a prompt list query into response models, optionally as summaries.
+    
+    Summaries defer the system_prompt column so list views don't load or send
+    every version's full prompt body. Results are validated here so they can be cached.
+    """
+    if not summary:
+        return _prompt_list_adapter.validate_python(query.all())
+    return _prompt_summary_list_adapter.validate_python(
+        query.options(defer(Prompt.system_prompt)).all()
+    )
+
 
 @router.post("/", response_model=PromptResponse)
-async def create_prompt(
+def create_prompt(
     request: CreatePromptRequest,
     db: Session = Depends(get_db)
 ) -> PromptResponse:
     """Create a new prompt or a new version of an existing prompt"""
-    # Verify CSV file exists if csv_file_id is provided
-    if request.csv_file_id:
-        get_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
-    
+    # Validate the request before any database lookups
     if not request.system_prompt or not request.system_prompt.strip():
         raise HTTPException(status_code=400, detail="system_prompt is required")
     
+    # Verify CSV file exists if csv_file_id is provided
+    if request.csv_file_id:
+        exists_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
+    
     # If parent_prompt_id is provided, create a new version
     if request.parent_prompt_id:
         parent_prompt = get_or_404(db, Prompt, request.parent_prompt_id, "Parent prompt not found")
         
         # Find the root prompt ID and get next version
-        root_prompt_id = get_root_prompt_id(db, request.parent_prompt_id)
-        version = get_next_prompt_version(db, root_prompt_id)
+        root_prompt_id, version = get_root_and_next_version(db, request.parent_prompt_id, parent_prompt)
         
-        prompt = Prompt(
+        values = dict(
             name=request.name or parent_prompt.name,
             system_prompt=request.system_prompt,
             user_message_column=request.user_message_column,
@@ -53,11 +75,11 @@ async def create_prompt(
         )
     else:
         # Create a new root prompt (version 1)
-        prompt = Prompt(
+        values = dict(
             name=request.name,
             system_prompt=request.system_prompt,
             user_message_column=request.user_message_column,
-            csv_file_id=request.csv_file_id,
+            csv_file_id=request.csv_file_id or None,  # 0 means no CSV file
             version=1,
             commit_message=request.commit_message,
             model=request.model,
@@ -67,24 +89,27 @@ async def create_prompt(
         )
     
     try:
-        db.add(prompt)
+        # Build the response before commit, which would expire the returned row
+        response = PromptResponse.model_validate(insert_returning(db, Prompt, values))
         db.commit()
-        db.refresh(prompt)
-        return prompt
+        invalidate_prompt_cache()
+        return response
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating prompt: {str(e)}")
 
 
-@router.get("/", response_model=List[PromptResponse])
-async def list_prompts(
+@router.get("/", response_model=Union[List[PromptResponse], List[PromptSummaryResponse]])
+def list_prompts(
     csv_file_id: Optional[int] = None,
     include_versions: bool = False,
+    summary: bool = False,
     db: Session = Depends(get_db)
-) -> List[PromptResponse]:
+) -> Response:
     """List all prompts, optionally filtered by CSV file.
     If include_versions is False, only returns root prompts (those without a parent).
-    If include_versions is True, returns all prompts including versions."""
+    If include_versions is True, returns all prompts including versions.
+    If summary is True, system prompts are omitted."""
     query = db.query(Prompt)
     
     if csv_file_id:
@@ -94,21 +119,26 @@ async def list_prompts(
         # Only return root prompts (no parent)
         query = query.filter(Prompt.parent_prompt_id.is_(None))
     
-    prompts = query.order_by(Prompt.created_at.desc()).all()
-    return prompts
+    return cached_prompt_response(
+        ("list", csv_file_id, include_versions, summary),
+        lambda: _list_prompts(query.order_by(Prompt.created_at.desc()), summary)
+    )
 
 
 @router.get("/{prompt_id}", response_model=PromptResponse)
-async def get_prompt(
+def get_prompt(
     prompt_id: int, 
     db: Session = Depends(get_db)
-) -> PromptResponse:
+) -> Response:
     """Get a specific prompt by ID"""
-    return get_or_404(db, Prompt, prompt_id, "Prompt not found")
+    return cached_prompt_response(
+        ("get", prompt_id),
+        lambda: PromptResponse.model_validate(get_or_404(db, Prompt, prompt_id, "Prompt not found"))
+    )
 
 
 @router.put("/{prompt_id}", response_model=PromptResponse)
-async def update_prompt(
+def update_prompt(
     prompt_id: int,
     request: UpdatePromptRequest,
     db: Session = Depends(get_db)
@@ -116,11 +146,11 @@ async def update_prompt(
     """Update a prompt"""
     prompt = get_or_404(db, Prompt, prompt_id, "Prompt not found")
     
-    # Verify CSV file exists if csv_file_id is provided
+    # Verify CSV file exists if csv_file_id is provided (0 unlinks the prompt from its CSV file)
     if request.csv_file_id is not None:
         if request.csv_file_id:
-            get_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
-        prompt.csv_file_id = request.csv_file_id
+            exists_or_404(db, CSVFile, request.csv_file_id, "CSV file not found")
+        prompt.csv_file_id = request.csv_file_id or None
     
     if request.name is not None:
         prompt.name = request.name
@@ -148,6 +178,7 @@ async def update_prompt(
     
     try:
         db.commit()
+        invalidate_prompt_cache()
         db.refresh(prompt)
         return prompt
     except Exception as e:
@@ -155,68 +186,93 @@ async def update_prompt(
         raise HTTPException(status_code=500, detail=f"Error updating prompt: {str(e)}")
 
 
-@router.get("/{prompt_id}/versions", response_model=List[PromptResponse])
-async def list_prompt_versions(
+@router.get("/{prompt_id}/versions", response_model=Union[List[PromptResponse], List[PromptSummaryResponse]])
+def list_prompt_versions(
     prompt_id: int, 
+    summary: bool = False,
     db: Session = Depends(get_db)
-) -> List[PromptResponse]:
-    """List all versions of a prompt"""
-    get_or_404(db, Prompt, prompt_id, "Prompt not found")
+) -> Response:
+    """List all versions of a prompt (without system prompts if summary is True)"""
+    return cached_prompt_response(
+        ("versions", prompt_id, summary),
+        lambda: _load_prompt_versions(db, prompt_id, summary)
+    )
+
+
+def _load_prompt_versions(
+    db: Session,
+    prompt_id: int,
+    summary: bool
+) -> Union[List[PromptResponse], List[PromptSummaryResponse]]:
+    """Load every version in a prompt's lineage (see list_prompt_versions)"""
+    prompt = get_or_404(db, Prompt, prompt_id, "Prompt not found")
     
     # Get the root prompt ID
-    root_prompt_id = get_root_prompt_id(db, prompt_id)
+    root_prompt_id = get_root_prompt_id(db, prompt_id, prompt)
     
-    # Get all versions (including the root)
-    versions = db.query(Prompt).filter(
-        (Prompt.id == root_prompt_id) | (Prompt.parent_prompt_id == root_prompt_id)
-    ).order_by(Prompt.version.asc()).all()
+    # The root is usually the prompt just loaded (db.get then hits the identity map),
+    # and its versions come from one seek on the parent/version index instead of an OR scan
+    root = prompt if root_prompt_id == prompt_id else db.get(Prompt, root_prompt_id)
+    children = _list_prompts(
+        db.query(Prompt).filter(Prompt.parent_prompt_id == root_prompt_id).order_by(Prompt.version.asc()),
+        summary
+    )
+    if root is None:
+        return children
     
-    return versions
+    # All versions (including the root), in version order
+    root_version = (PromptSummaryResponse if summary else PromptResponse).model_validate(root)
+    return sorted([root_version, *children], key=lambda p: p.version)
 
 
-@router.get("/grouped/by-name", response_model=Dict[str, List[PromptResponse]])
-async def list_prompts_grouped_by_name(
+@router.get(
+    "/grouped/by-name",
+    response_model=Union[Dict[str, List[PromptResponse]], Dict[str, List[PromptSummaryResponse]]]
+)
+def list_prompts_grouped_by_name(
     csv_file_id: Optional[int] = None,
+    summary: bool = False,
     db: Session = Depends(get_db)
-) -> Dict[str, List[PromptResponse]]:
-    """List all prompts grouped by name (list of lists structure)"""
+) -> Response:
+    """List all prompts grouped by name (list of lists structure), without system prompts if summary is True"""
     query = db.query(Prompt)
     
     if csv_file_id:
         query = query.filter(Prompt.csv_file_id == csv_file_id)
     
-    prompts = query.order_by(Prompt.created_at.desc()).all()
-    
-    # Group by name (use "Unnamed" for null names)
-    grouped: Dict[str, List[PromptResponse]] = defaultdict(list)
-    for prompt in prompts:
-        name = prompt.name or "Unnamed"
-        grouped[name].append(prompt)
-    
-    # Sort versions within each group by version number
-    for name in grouped:
-        grouped[name].sort(key=lambda p: p.version)
+    def load() -> Dict[str, List[Union[PromptResponse, PromptSummaryResponse]]]:
+        # Let the database order by group then version, so grouping is a single pass
+        group_name = func.coalesce(Prompt.name, "Unnamed")
+        prompts = _list_prompts(
+            query.order_by(group_name.asc(), Prompt.version.asc(), Prompt.created_at.desc()),
+            summary
+        )
+        
+        # Group by name (use "Unnamed" for null names)
+        grouped: Dict[str, List[Union[PromptResponse, PromptSummaryResponse]]] = {}
+        for prompt in prompts:
+            grouped.setdefault(prompt.name or "Unnamed", []).append(prompt)
+        return grouped
     
-    return dict(grouped)
+    return cached_prompt_response(("grouped", csv_file_id, summary), load)
 
 
 @router.post("/{prompt_id}/versions", response_model=PromptResponse)
-async def create_prompt_version(
+def create_prompt_version(
     prompt_id: int,
     request: CreateVersionRequest,
     db: Session = Depends(get_db)
 ) -> PromptResponse:
     """Create a new version of an existing prompt"""
+    if not request.system_prompt:
+        raise HTTPException(status_code=400, detail="system_prompt is required")
+    
     parent_prompt = get_or_404(db, Prompt, prompt_id, "Prompt not found")
     
     # Get the root prompt ID and next version
-    root_prompt_id = get_root_prompt_id(db, prompt_id)
-    version = get_next_prompt_version(db, root_prompt_id)
+    root_prompt_id, version = get_root_and_next_version(db, prompt_id, parent_prompt)
     
-    if not request.system_prompt:
-        raise HTTPException(status_code=400, detail="system_prompt is required")
-    
-    prompt = Prompt(
+    values = dict(
         name=request.name or parent_prompt.name,
         system_prompt=request.system_prompt,
         user_message_column=request.user_message_column if request.user_message_column is not None else parent_prompt.user_message_column,
@@ -231,24 +287,33 @@ async def create_prompt_version(
     )
     
     try:
-        db.add(prompt)
+        response = PromptResponse.model_validate(insert_returning(db, Prompt, values))
         db.commit()
-        db.refresh(prompt)
-        return prompt
+        invalidate_prompt_cache()
+        return response
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating prompt version: {str(e)}")
 
 
 @router.delete("/{prompt_id}")
-async def delete_prompt(
+def delete_prompt(
     prompt_id: int, 
     db: Session = Depends(get_db)
 ) -> dict[str, str | int]:
     """Delete a prompt"""
     prompt = get_or_404(db, Prompt, prompt_id, "Prompt not found")
+    
+    # GEPA configs require a base prompt, so the database can't SET NULL them
+    if db.query(exists().where(GepaConfig.base_prompt_id == prompt_id)).scalar():
+        raise HTTPException(
+            status_code=400,
+            detail="Prompt is the base prompt of a GEPA config; update or delete the config first"
+        )
+    
     db.delete(prompt)
     db.commit()
+    invalidate_prompt_cache()
     
     return {"message": "Prompt deleted successfully", "id": prompt_id}
 
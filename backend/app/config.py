@@ -1,20 +1,34 @@
 """Configuration settings"""
 import os
-from typing import List
+from typing import Tuple
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./evaluizer.db")
 
+# Connection pool sizing for server databases (PostgreSQL/MySQL); SQLite keeps its defaults
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced
+
+# Create missing tables and indexes at startup. Disable ("0") when the schema is
+# managed at deploy time so each worker skips the per-table existence checks.
+AUTO_CREATE_TABLES = os.getenv("AUTO_CREATE_TABLES", "1") == "1"
+
 # Application settings
 API_V1_PREFIX = "/api/v1"
 
-# CORS configuration
-CORS_ORIGINS: List[str] = [
+# LLM response cache (deterministic calls only)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "4096"))
+
+# GEPA: rows generated and graded at once when evaluating a candidate prompt
+GEPA_MAX_CONCURRENCY = max(1, int(os.getenv("GEPA_MAX_CONCURRENCY", "32")))
+
+# CORS configuration: defaults plus extra origins from the environment
+# (comma-separated), de-duplicated in order and frozen
+CORS_ORIGINS: Tuple[str, ...] = tuple(dict.fromkeys([
     "http://localhost:3000",
     "http://localhost:5173",
-]
-
-# Allow additional origins from environment variable (comma-separated)
-_extra_origins = os.getenv("CORS_ORIGINS", "")
-if _extra_origins:
-    CORS_ORIGINS.extend([origin.strip() for origin in _extra_origins.split(",") if origin.strip()])
+    *(origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()),
+]))
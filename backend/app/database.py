@@ -1,24 +1,100 @@
 """Database connection and session management"""
-from typing import Generator
-from sqlalchemy import create_engine
+from typing import Any, Generator
+import orjson
+from sqlalchemy import DateTime, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from sqlalchemy.orm import DeclarativeBase, sessionmaker, Session
-from app.config import DATABASE_URL
+from app.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
 
 # Use DeclarativeBase for SQLAlchemy 2.0 compatibility
 class Base(DeclarativeBase):
     pass
 
+
+class local_now(FunctionElement):
+    """
+    The database's current local time, for timestamp column defaults.
+    
+    Rendered into the INSERT/UPDATE itself, so the database stamps rows (including
+    bulk inserts) instead of Python computing a datetime.now() per row. Values stay
+    naive local times with sub-second precision, matching existing rows.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(local_now)
+def _compile_local_now(element: local_now, compiler: Any, **kw: Any) -> str:
+    return "LOCALTIMESTAMP"
+
+
+@compiles(local_now, "sqlite")
+def _compile_local_now_sqlite(element: local_now, compiler: Any, **kw: Any) -> str:
+    # SQLite's CURRENT_TIMESTAMP is UTC with whole seconds
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+
+
+def _json_serializer(obj: Any) -> str:
+    """Serialize JSON columns with orjson (SQLAlchemy expects a str)"""
+    return orjson.dumps(obj).decode()
+
+
+# Pool sizing only applies to server databases; SQLite uses SQLAlchemy's defaults
+_pool_options = {} if "sqlite" in DATABASE_URL else {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+}
+
 # Configure engine with connection pooling
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
     pool_pre_ping=True,  # Verify connections before using
+    **_pool_options,
     echo=False,  # Set to True for SQL query logging
+    # JSON columns (CSV columns/row data) are (de)serialized with orjson
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
 )
 
+
+if "sqlite" in DATABASE_URL:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        """
+        Tune every new SQLite connection.
+        
+        WAL lets readers proceed while a write is in progress (the default rollback
+        journal blocks them), and synchronous=NORMAL is safe under WAL. Foreign keys
+        are off by default in SQLite; the models' ON DELETE actions (and their
+        passive_deletes relationships) rely on them.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def create_missing_indexes() -> None:
+    """
+    Create indexes declared on the models that don't exist in the database yet.
+    
+    Base.metadata.create_all only creates indexes together with new tables, so
+    indexes added to existing tables are created here (there are no migrations).
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 def get_db() -> Generator[Session, None, None]:
     """Dependency to get database session"""
     db = SessionLocal()
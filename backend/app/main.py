@@ -2,14 +2,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import api_router
-from app.config import API_V1_PREFIX, CORS_ORIGINS
-from app.database import engine, Base
+from app.config import API_V1_PREFIX, CORS_ORIGINS, AUTO_CREATE_TABLES
+from app.database import engine, Base, SessionLocal, create_missing_indexes
+from app.utils import flatten_prompt_lineage, migrate_gepa_config_links
+from app.services.llm_cache import llm_cache
 
 # Import all models to ensure they're registered with SQLAlchemy
-from app.models import CSVFile, CSVRow, Evaluation, Prompt, JudgeConfig, JudgeResult, FunctionEvalConfig, FunctionEvalResult, Metric, GepaConfig  # noqa: F401
+from app.models import CSVFile, CSVRow, Evaluation, Prompt, JudgeConfig, JudgeResult, FunctionEvalConfig, FunctionEvalResult, Metric, GepaConfig, LLMCacheEntry  # noqa: F401
 
-# Create database tables (only creates if they don't exist)
-Base.metadata.create_all(bind=engine)
+# Create database tables (only creates if they don't exist) and bring older databases up to date
+if AUTO_CREATE_TABLES:
+    Base.metadata.create_all(bind=engine)
+    create_missing_indexes()
+    with SessionLocal() as db:
+        flatten_prompt_lineage(db)
+        migrate_gepa_config_links(db)
+        db.commit()
+
+# Drop LLM cache rows that expired while the server was down
+llm_cache.purge_expired()
 
 app = FastAPI(title="Evaluizer API", version="1.0.0")
 
@@ -5,5 +5,6 @@ from app.models.judge import JudgeConfig, JudgeResult
 from app.models.function_eval import FunctionEvalConfig, FunctionEvalResult
 from app.models.metric import Metric
 from app.models.gepa import GepaConfig
+from app.models.llm_cache import LLMCacheEntry
 
-__all__ = ["CSVFile", "CSVRow", "Evaluation", "Prompt", "JudgeConfig", "JudgeResult", "FunctionEvalConfig", "FunctionEvalResult", "Metric", "GepaConfig"]
+__all__ = ["CSVFile", "CSVRow", "Evaluation", "Prompt", "JudgeConfig", "JudgeResult", "FunctionEvalConfig", "FunctionEvalResult", "Metric", "GepaConfig", "LLMCacheEntry"]
@@ -1,8 +1,7 @@
 """CSV data models"""
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.database import Base
+from app.database import Base, local_now
 
 
 class CSVFile(Base):
@@ -11,17 +10,18 @@ class CSVFile(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
-    uploaded_at = Column(DateTime, default=datetime.now)
-    columns = Column(Text, nullable=False)  # JSON string of column names (original columns only)
+    uploaded_at = Column(DateTime, default=local_now(), server_default=local_now())
+    columns = Column(JSON, nullable=False)  # List of column names (original columns only)
     
-    rows = relationship("CSVRow", back_populates="csv_file", cascade="all, delete-orphan")
-    evaluations = relationship("Evaluation", back_populates="csv_file", cascade="all, delete-orphan")
-    judge_configs = relationship("JudgeConfig", back_populates="csv_file", cascade="all, delete-orphan")
-    judge_results = relationship("JudgeResult", back_populates="csv_file", cascade="all, delete-orphan")
-    function_eval_configs = relationship("FunctionEvalConfig", back_populates="csv_file", cascade="all, delete-orphan")
-    function_eval_results = relationship("FunctionEvalResult", back_populates="csv_file", cascade="all, delete-orphan")
-    metrics = relationship("Metric", back_populates="csv_file", cascade="all, delete-orphan")
-    gepa_configs = relationship("GepaConfig", back_populates="csv_file", cascade="all, delete-orphan")
+    rows = relationship("CSVRow", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
+    evaluations = relationship("Evaluation", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
+    judge_configs = relationship("JudgeConfig", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
+    judge_results = relationship("JudgeResult", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
+    function_eval_configs = relationship("FunctionEvalConfig", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
+    function_eval_results = relationship("FunctionEvalResult", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
+    metrics = relationship("Metric", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
+    gepa_configs = relationship("GepaConfig", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
+    prompts = relationship("Prompt", back_populates="csv_file", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class CSVRow(Base):
@@ -30,9 +30,9 @@ class CSVRow(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     csv_file_id = Column(Integer, ForeignKey("csv_files.id", ondelete="CASCADE"), nullable=False)
-    row_data = Column(Text, nullable=False)  # JSON string of row data (original columns only)
+    row_data = Column(JSON, nullable=False)  # Dict of row data (original columns only)
     
     csv_file = relationship("CSVFile", back_populates="rows")
-    evaluation = relationship("Evaluation", back_populates="csv_row", uselist=False, cascade="all, delete-orphan")
-    judge_results = relationship("JudgeResult", back_populates="csv_row", cascade="all, delete-orphan")
-    function_eval_results = relationship("FunctionEvalResult", back_populates="csv_row", cascade="all, delete-orphan")
+    evaluation = relationship("Evaluation", back_populates="csv_row", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    judge_results = relationship("JudgeResult", back_populates="csv_row", cascade="all, delete-orphan", passive_deletes=True)
+    function_eval_results = relationship("FunctionEvalResult", back_populates="csv_row", cascade="all, delete-orphan", passive_deletes=True)
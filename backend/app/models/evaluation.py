@@ -1,8 +1,7 @@
 """Evaluation model"""
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, ForeignKey, DateTime, UniqueConstraint, CheckConstraint, Index, text
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.database import Base
+from app.database import Base, local_now
 
 
 class Evaluation(Base):
@@ -14,17 +13,34 @@ class Evaluation(Base):
     csv_row_id = Column(Integer, ForeignKey("csv_rows.id", ondelete="CASCADE"), nullable=False)
     prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), nullable=False)
     output = Column(Text, nullable=True)  # Generated output text
-    annotation = Column(Integer, nullable=True)  # 1 for thumbs up, 0 for thumbs down, None for null
+    annotation = Column(SmallInteger, nullable=True)  # 1 for thumbs up, 0 for thumbs down, None for null
     feedback = Column(Text, nullable=True)  # User feedback text
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    updated_at = Column(DateTime, default=local_now(), server_default=local_now(), onupdate=local_now())
     
-    # Unique constraint: one evaluation per row per prompt
+    # Unique constraint: one evaluation per row per prompt.
+    # Its backing index also serves the (csv_row_id, prompt_id) lookups in run_prompt and friends.
     __table_args__ = (
         UniqueConstraint('csv_row_id', 'prompt_id', name='uq_evaluation_row_prompt'),
+        # Same domain as the request validators (NULL passes)
+        CheckConstraint('annotation IN (0, 1)', name='ck_evaluation_annotation'),
+        # Partial covering index for the human-annotation best-prompt aggregation
+        Index(
+            'ix_evaluation_file_prompt_annotated',
+            'csv_file_id', 'prompt_id', 'annotation',
+            sqlite_where=text('annotation IS NOT NULL'),
+            postgresql_where=text('annotation IS NOT NULL'),
+        ),
+        # Per-file, per-prompt evaluation listing; PostgreSQL also carries annotation
+        # in the index (output/feedback are left out, they can be large)
+        Index(
+            'ix_evaluation_file_prompt_row',
+            'csv_file_id', 'prompt_id', 'csv_row_id',
+            postgresql_include=['annotation'],
+        ),
     )
     
     csv_file = relationship("CSVFile", back_populates="evaluations")
     csv_row = relationship("CSVRow", back_populates="evaluation")
-    prompt = relationship("Prompt", foreign_keys=[prompt_id])
+    prompt = relationship("Prompt", back_populates="evaluations")
 
@@ -1,8 +1,8 @@
 """Function evaluation models"""
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, UniqueConstraint, JSON
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, UniqueConstraint, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.database import Base
+from app.database import Base, local_now
 
 
 class FunctionEvalConfig(Base):
@@ -11,11 +11,11 @@ class FunctionEvalConfig(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     csv_file_id = Column(Integer, ForeignKey("csv_files.id", ondelete="CASCADE"), nullable=False)
-    name = Column(String, nullable=False)  # Unique per CSV file, used as column name
-    function_name = Column(String, nullable=False)  # Plugin name from evaluations registry
-    config = Column(JSON, nullable=True)  # Optional per-eval config (JSON dict)
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    name = Column(String(128), nullable=False)  # Unique per CSV file, used as column name
+    function_name = Column(String(64), nullable=False)  # Plugin name from evaluations registry
+    config = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # Optional per-eval config (JSON dict; JSONB on PostgreSQL)
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    updated_at = Column(DateTime, default=local_now(), server_default=local_now(), onupdate=local_now())
     
     # Unique constraint: name must be unique per CSV file
     __table_args__ = (
@@ -23,7 +23,8 @@ class FunctionEvalConfig(Base):
     )
     
     csv_file = relationship("CSVFile", back_populates="function_eval_configs")
-    results = relationship("FunctionEvalResult", back_populates="config", cascade="all, delete-orphan")
+    results = relationship("FunctionEvalResult", back_populates="config", cascade="all, delete-orphan", passive_deletes=True)
+    gepa_configs = relationship("GepaConfig", secondary="gepa_function_eval_configs", back_populates="function_eval_configs", passive_deletes=True)
 
 
 class FunctionEvalResult(Base):
@@ -37,16 +38,23 @@ class FunctionEvalResult(Base):
     prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), nullable=False)
     score = Column(Float, nullable=False)  # Score from function evaluation
     details = Column(JSON, nullable=True)  # Optional details/metadata from evaluation
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    updated_at = Column(DateTime, default=local_now(), server_default=local_now(), onupdate=local_now())
     
-    # Unique constraint: one result per config per row per prompt
+    # Unique constraint: one result per config per row per prompt.
+    # Its backing index also serves the run_function_eval upsert lookup.
     __table_args__ = (
         UniqueConstraint('config_id', 'csv_row_id', 'prompt_id', name='uq_function_eval_result_config_row_prompt'),
+        # Covering index for the best-prompts aggregation (filter by file, group by config/prompt, avg score)
+        Index('ix_function_eval_result_file_config_prompt_score', 'csv_file_id', 'config_id', 'prompt_id', 'score'),
+        # Results for a prompt within a CSV file, and cascade deletes of a prompt's results
+        Index('ix_function_eval_result_prompt_file', 'prompt_id', 'csv_file_id'),
+        # Cascade deletes of a row's results (config_id lookups use the unique constraint's index)
+        Index('ix_function_eval_result_csv_row', 'csv_row_id'),
     )
     
     config = relationship("FunctionEvalConfig", back_populates="results")
     csv_file = relationship("CSVFile", back_populates="function_eval_results")
     csv_row = relationship("CSVRow", back_populates="function_eval_results")
-    prompt = relationship("Prompt", foreign_keys=[prompt_id])
+    prompt = relationship("Prompt", back_populates="function_eval_results")
 
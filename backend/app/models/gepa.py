@@ -1,8 +1,25 @@
 """GEPA Optimizer models"""
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, JSON, Float
+from typing import List
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, Table
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.database import Base
+from app.database import Base, local_now
+
+
+# Evaluation configs used by each GEPA config (the index on the second key
+# column serves reverse lookups and cascade deletes of the evaluation config)
+gepa_judge_configs = Table(
+    "gepa_judge_configs",
+    Base.metadata,
+    Column("gepa_config_id", Integer, ForeignKey("gepa_configs.id", ondelete="CASCADE"), primary_key=True),
+    Column("judge_config_id", Integer, ForeignKey("judge_configs.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+
+gepa_function_eval_configs = Table(
+    "gepa_function_eval_configs",
+    Base.metadata,
+    Column("gepa_config_id", Integer, ForeignKey("gepa_configs.id", ondelete="CASCADE"), primary_key=True),
+    Column("function_eval_config_id", Integer, ForeignKey("function_eval_configs.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
 
 
 class GepaConfig(Base):
@@ -11,18 +28,14 @@ class GepaConfig(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     csv_file_id = Column(Integer, ForeignKey("csv_files.id", ondelete="CASCADE"), nullable=False)
-    name = Column(String, nullable=False)
+    name = Column(String(128), nullable=False)
     
     # Base prompt to optimize (required)
     base_prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="SET NULL"), nullable=False)
     
-    # Evaluation configs (stored as JSON arrays of IDs)
-    judge_config_ids = Column(JSON, nullable=True)  # List of judge config IDs
-    function_eval_config_ids = Column(JSON, nullable=True)  # List of function eval config IDs
-    
     # GEPA LLM settings
-    generator_model = Column(String, nullable=False, default="gpt-5")  # Model for generating outputs (the model you're optimizing for)
-    reflection_model = Column(String, nullable=False, default="gpt-5")  # Model for reflection/meta-prompt (can be different, often more powerful)
+    generator_model = Column(String(255), nullable=False, default="gpt-5")  # Model for generating outputs (the model you're optimizing for)
+    reflection_model = Column(String(255), nullable=False, default="gpt-5")  # Model for reflection/meta-prompt (can be different, often more powerful)
     generator_temperature = Column(Float, nullable=False, default=1.0)  # Temperature for generator model calls
     generator_max_tokens = Column(Integer, nullable=False, default=16384)  # Max tokens for generator model completions
     reflection_temperature = Column(Float, nullable=False, default=1.0)  # Temperature for reflection model calls
@@ -31,9 +44,29 @@ class GepaConfig(Base):
     # Optimization budget
     max_metric_calls = Column(Integer, nullable=False, default=10)  # Max number of evaluations
     
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    updated_at = Column(DateTime, default=local_now(), server_default=local_now(), onupdate=local_now())
     
     csv_file = relationship("CSVFile", back_populates="gepa_configs")
-    base_prompt = relationship("Prompt", foreign_keys=[base_prompt_id])
+    base_prompt = relationship("Prompt", back_populates="gepa_configs")
+    
+    # Evaluation configs (link tables), loaded with the config in one extra query each
+    judge_configs = relationship(
+        "JudgeConfig", secondary=gepa_judge_configs, back_populates="gepa_configs",
+        order_by="JudgeConfig.id", lazy="selectin", passive_deletes=True
+    )
+    function_eval_configs = relationship(
+        "FunctionEvalConfig", secondary=gepa_function_eval_configs, back_populates="gepa_configs",
+        order_by="FunctionEvalConfig.id", lazy="selectin", passive_deletes=True
+    )
+    
+    @property
+    def judge_config_ids(self) -> List[int]:
+        """IDs of the judge configs, as exposed by the API"""
+        return [config.id for config in self.judge_configs]
+    
+    @property
+    def function_eval_config_ids(self) -> List[int]:
+        """IDs of the function eval configs, as exposed by the API"""
+        return [config.id for config in self.function_eval_configs]
 
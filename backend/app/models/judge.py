@@ -1,8 +1,7 @@
 """Judge evaluation models"""
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.database import Base
+from app.database import Base, local_now
 
 
 class JudgeConfig(Base):
@@ -11,13 +10,13 @@ class JudgeConfig(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     csv_file_id = Column(Integer, ForeignKey("csv_files.id", ondelete="CASCADE"), nullable=False)
-    name = Column(String, nullable=False)  # Unique per CSV file, used as column name
+    name = Column(String(128), nullable=False)  # Unique per CSV file, used as column name
     prompt = Column(Text, nullable=False)  # Core judge prompt (will be wrapped with prefix/suffix)
-    model = Column(String, nullable=False)  # LiteLLM model ID
+    model = Column(String(255), nullable=False)  # LiteLLM model ID
     temperature = Column(Float, nullable=False, default=1.0)
     max_tokens = Column(Integer, nullable=False, default=2000)
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    updated_at = Column(DateTime, default=local_now(), server_default=local_now(), onupdate=local_now())
     
     # Unique constraint: name must be unique per CSV file
     __table_args__ = (
@@ -25,7 +24,8 @@ class JudgeConfig(Base):
     )
     
     csv_file = relationship("CSVFile", back_populates="judge_configs")
-    results = relationship("JudgeResult", back_populates="config", cascade="all, delete-orphan")
+    results = relationship("JudgeResult", back_populates="config", cascade="all, delete-orphan", passive_deletes=True)
+    gepa_configs = relationship("GepaConfig", secondary="gepa_judge_configs", back_populates="judge_configs", passive_deletes=True)
 
 
 class JudgeResult(Base):
@@ -39,16 +39,23 @@ class JudgeResult(Base):
     prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), nullable=False)
     score = Column(Float, nullable=False)  # Parsed score from <score>...</score>
     raw_output = Column(Text, nullable=True)  # Full LLM output text
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    updated_at = Column(DateTime, default=local_now(), server_default=local_now(), onupdate=local_now())
     
-    # Unique constraint: one result per config per row per prompt
+    # Unique constraint: one result per config per row per prompt.
+    # Its backing index also serves the run_judge upsert lookup, so no separate index is needed.
     __table_args__ = (
         UniqueConstraint('config_id', 'csv_row_id', 'prompt_id', name='uq_judge_result_config_row_prompt'),
+        # Covering index for the best-prompts aggregation (filter by file, group by config/prompt, avg score)
+        Index('ix_judge_result_file_config_prompt_score', 'csv_file_id', 'config_id', 'prompt_id', 'score'),
+        # Results for a prompt within a CSV file, and cascade deletes of a prompt's results
+        Index('ix_judge_result_prompt_file', 'prompt_id', 'csv_file_id'),
+        # Cascade deletes of a row's results (config_id lookups use the unique constraint's index)
+        Index('ix_judge_result_csv_row', 'csv_row_id'),
     )
     
     config = relationship("JudgeConfig", back_populates="results")
     csv_file = relationship("CSVFile", back_populates="judge_results")
     csv_row = relationship("CSVRow", back_populates="judge_results")
-    prompt = relationship("Prompt", foreign_keys=[prompt_id])
+    prompt = relationship("Prompt", back_populates="judge_results")
 
@@ -0,0 +1,13 @@
+"""LLM response cache model"""
+from sqlalchemy import Column, String, Text, DateTime
+from app.database import Base, local_now
+
+
+class LLMCacheEntry(Base):
+    """Model for persisting cached LLM completions so they survive restarts"""
+    __tablename__ = "cache_entries"
+    
+    key = Column(String(64), primary_key=True)  # blake2b hex digest of model, params and messages
+    output = Column(Text, nullable=False)  # Completion text returned by the LLM
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,8 +1,10 @@
 """Metric/Threshold model"""
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, UniqueConstraint
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Enum as SQLEnum, UniqueConstraint
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.database import Base
+from app.database import Base, local_now
+
+# Native enum type on PostgreSQL; elsewhere a VARCHAR with a CHECK constraint
+MetricType = SQLEnum('human_annotation', 'judge', 'function_eval', name='metric_type_enum', create_constraint=True)
 
 
 class Metric(Base):
@@ -11,11 +13,11 @@ class Metric(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     csv_file_id = Column(Integer, ForeignKey("csv_files.id", ondelete="CASCADE"), nullable=False)
-    metric_type = Column(String, nullable=False)  # 'human_annotation', 'judge', 'function_eval'
+    metric_type = Column(MetricType, nullable=False)  # 'human_annotation', 'judge', 'function_eval'
     config_id = Column(Integer, nullable=True)  # For judge/function_eval metrics, the config ID. Null for human_annotation
     threshold = Column(Float, nullable=False)  # The threshold value
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    updated_at = Column(DateTime, default=local_now(), server_default=local_now(), onupdate=local_now())
     
     # Unique constraint: one metric per type/config per CSV file
     __table_args__ = (
@@ -1,7 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, Index, text
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.database import Base
+from app.database import Base, local_now
 
 
 class Prompt(Base):
@@ -9,7 +8,7 @@ class Prompt(Base):
     __tablename__ = "prompts"
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=True)  # Prompt name (like git branch name)
+    name = Column(String(128), nullable=True)  # Prompt name (like git branch name)
     system_prompt = Column(Text, nullable=False)  # System prompt template (can include {{variable}} syntax for columns)
     user_message_column = Column(String, nullable=True)  # Column name that contains the user message for each row
     csv_file_id = Column(Integer, ForeignKey("csv_files.id", ondelete="CASCADE"), nullable=True)  # Optional link to specific CSV file
@@ -18,14 +17,35 @@ class Prompt(Base):
     parent_prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="SET NULL"), nullable=True)  # Reference to parent prompt (for versioning)
     
     # LLM Configuration (saved with each prompt version)
-    model = Column(String, nullable=True)  # e.g., "gpt-4", "claude-3-5-sonnet-20241022"
+    model = Column(String(255), nullable=True)  # e.g., "gpt-4", "claude-3-5-sonnet-20241022"
     temperature = Column(Float, nullable=True)  # 0.0 to 1.0
     max_tokens = Column(Integer, nullable=True)  # Maximum tokens for response
     concurrency = Column(Integer, nullable=True)  # Number of concurrent requests
     
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=local_now(), server_default=local_now())
+    updated_at = Column(DateTime, default=local_now(), server_default=local_now(), onupdate=local_now())
     
-    csv_file = relationship("CSVFile", foreign_keys=[csv_file_id])
-    parent_prompt = relationship("Prompt", remote_side=[id], backref="versions")
+    __table_args__ = (
+        # Version lookups: list a root's versions and MAX(version) under a root
+        Index('ix_prompts_parent_version', 'parent_prompt_id', 'version'),
+        # Prompt lists filtered by CSV file
+        Index('ix_prompts_csv_file_id', 'csv_file_id'),
+        # Partial index for the default prompt list: root prompts of a CSV file, newest first
+        Index(
+            'ix_prompts_root_file_created',
+            'csv_file_id', 'created_at',
+            sqlite_where=text('parent_prompt_id IS NULL'),
+            postgresql_where=text('parent_prompt_id IS NULL'),
+        ),
+        # Prompts grouped by name, versions in order
+        Index('ix_prompts_name_version', 'name', 'version'),
+    )
+    
+    csv_file = relationship("CSVFile", back_populates="prompts")
+    parent_prompt = relationship("Prompt", remote_side=[id], back_populates="versions")
+    versions = relationship("Prompt", back_populates="parent_prompt", order_by="Prompt.version", passive_deletes=True)
+    evaluations = relationship("Evaluation", back_populates="prompt", cascade="all, delete-orphan", passive_deletes=True)
+    judge_results = relationship("JudgeResult", back_populates="prompt", cascade="all, delete-orphan", passive_deletes=True)
+    function_eval_results = relationship("FunctionEvalResult", back_populates="prompt", cascade="all, delete-orphan", passive_deletes=True)
+    gepa_configs = relationship("GepaConfig", back_populates="base_prompt", passive_deletes=True)
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -10,8 +10,7 @@ class CSVFileResponse(BaseModel):
     columns: List[str]
     row_count: int
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CSVRowResponse(BaseModel):
@@ -19,8 +18,7 @@ class CSVRowResponse(BaseModel):
     csv_file_id: int
     row_data: Dict[str, Any]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CSVFileWithRowsResponse(BaseModel):
@@ -31,8 +29,7 @@ class CSVFileWithRowsResponse(BaseModel):
     row_count: int
     rows: List[CSVRowResponse]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DropColumnsRequest(BaseModel):
@@ -1,7 +1,10 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict, field_validator
 from datetime import datetime
 from typing import Optional
 
+# 1 for thumbs up, 0 for thumbs down
+_ALLOWED_ANNOTATIONS = frozenset({0, 1})
+
 
 class EvaluationResponse(BaseModel):
     id: int
@@ -14,8 +17,7 @@ class EvaluationResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UpdateEvaluationRequest(BaseModel):
@@ -27,7 +29,7 @@ class UpdateEvaluationRequest(BaseModel):
     @field_validator('annotation')
     @classmethod
     def validate_annotation(cls, v):
-        if v is not None and v not in [0, 1]:
+        if v is not None and v not in _ALLOWED_ANNOTATIONS:
             raise ValueError('annotation must be 0, 1, or None')
         return v
 
@@ -42,7 +44,7 @@ class CreateEvaluationRequest(BaseModel):
     @field_validator('annotation')
     @classmethod
     def validate_annotation(cls, v):
-        if v is not None and v not in [0, 1]:
+        if v is not None and v not in _ALLOWED_ANNOTATIONS:
             raise ValueError('annotation must be 0, 1, or None')
         return v
 
@@ -1,7 +1,7 @@
 """Schemas for function-based evaluation endpoints."""
 
-from pydantic import BaseModel, field_validator
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
@@ -44,15 +44,14 @@ class FunctionEvalConfigResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CreateFunctionEvalConfigRequest(BaseModel):
     """Request to create a function evaluation config."""
     csv_file_id: int
-    name: str
-    function_name: str
+    name: str = Field(max_length=128)
+    function_name: str = Field(max_length=64)
     config: Optional[Dict[str, Any]] = None
     
     @field_validator('name')
@@ -72,7 +71,7 @@ class CreateFunctionEvalConfigRequest(BaseModel):
 
 class UpdateFunctionEvalConfigRequest(BaseModel):
     """Request to update a function evaluation config."""
-    name: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=128)
     config: Optional[Dict[str, Any]] = None
     
     @field_validator('name')
@@ -95,8 +94,7 @@ class FunctionEvalResultResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class RunFunctionEvalRequest(BaseModel):
@@ -105,3 +103,17 @@ class RunFunctionEvalRequest(BaseModel):
     csv_row_id: int
     prompt_id: int
 
+
+class RunFunctionEvalBatchRequest(BaseModel):
+    """Request to run a configured function evaluation over many rows."""
+    config_id: int
+    prompt_id: int
+    csv_row_ids: List[int]
+
+
+class FunctionEvalBatchResult(BaseModel):
+    """Outcome for one row of a batch run: the saved result, or why it failed."""
+    csv_row_id: int
+    result: Optional[FunctionEvalResultResponse] = None
+    error: Optional[str] = None
+
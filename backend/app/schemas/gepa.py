@@ -1,5 +1,5 @@
 """GEPA Optimizer schemas"""
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import datetime
 from typing import Optional, List
 
@@ -22,19 +22,18 @@ class GepaConfigResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CreateGepaConfigRequest(BaseModel):
     """Request to create a GEPA config"""
     csv_file_id: int
-    name: str
+    name: str = Field(max_length=128)
     base_prompt_id: int  # Required - must have a prompt to optimize
     judge_config_ids: Optional[List[int]] = None
     function_eval_config_ids: Optional[List[int]] = None
-    generator_model: str = "gpt-5"  # Model for generating outputs (the model you're optimizing for)
-    reflection_model: Optional[str] = None  # Model for reflection/meta-prompt (defaults to generator_model if not specified)
+    generator_model: str = Field("gpt-5", max_length=255)  # Model for generating outputs (the model you're optimizing for)
+    reflection_model: Optional[str] = Field(None, max_length=255)  # Model for reflection/meta-prompt (defaults to generator_model if not specified)
     generator_temperature: float = 1.0
     generator_max_tokens: int = 16384
     reflection_temperature: float = 1.0
@@ -58,12 +57,12 @@ class CreateGepaConfigRequest(BaseModel):
 
 class UpdateGepaConfigRequest(BaseModel):
     """Request to update a GEPA config"""
-    name: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=128)
     base_prompt_id: Optional[int] = None  # Can update to a different prompt
     judge_config_ids: Optional[List[int]] = None
     function_eval_config_ids: Optional[List[int]] = None
-    generator_model: Optional[str] = None  # Model for generating outputs
-    reflection_model: Optional[str] = None  # Model for reflection/meta-prompt
+    generator_model: Optional[str] = Field(None, max_length=255)  # Model for generating outputs
+    reflection_model: Optional[str] = Field(None, max_length=255)  # Model for reflection/meta-prompt
     generator_temperature: Optional[float] = None
     generator_max_tokens: Optional[int] = None
     reflection_temperature: Optional[float] = None
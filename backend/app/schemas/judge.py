@@ -1,4 +1,4 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import datetime
 from typing import Optional
 
@@ -14,15 +14,14 @@ class JudgeConfigResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class CreateJudgeConfigRequest(BaseModel):
     csv_file_id: int
-    name: str
+    name: str = Field(max_length=128)
     prompt: str
-    model: str
+    model: str = Field(max_length=255)
     temperature: float = 1.0
     max_tokens: int = 2000
     
@@ -56,9 +55,9 @@ class CreateJudgeConfigRequest(BaseModel):
 
 
 class UpdateJudgeConfigRequest(BaseModel):
-    name: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=128)
     prompt: Optional[str] = None
-    model: Optional[str] = None
+    model: Optional[str] = Field(None, max_length=255)
     temperature: Optional[float] = None
     max_tokens: Optional[int] = None
     
@@ -102,8 +101,7 @@ class JudgeResultResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class JudgeRunRequest(BaseModel):
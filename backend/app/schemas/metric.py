@@ -1,52 +1,32 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional, Dict
+from typing import List, Literal, Optional
+
+MetricType = Literal['human_annotation', 'judge', 'function_eval']
 
 
 class MetricResponse(BaseModel):
     id: int
     csv_file_id: int
-    metric_type: str  # 'human_annotation', 'judge', 'function_eval'
+    metric_type: MetricType
     config_id: Optional[int] = None
     threshold: float
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    # Frozen: instances are cached and shared between requests
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 class CreateMetricRequest(BaseModel):
     csv_file_id: int
-    metric_type: str
+    metric_type: MetricType
     config_id: Optional[int] = None
     threshold: float
-    
-    @field_validator('metric_type')
-    @classmethod
-    def validate_metric_type(cls, v):
-        allowed_types = ['human_annotation', 'judge', 'function_eval']
-        if v not in allowed_types:
-            raise ValueError(f'metric_type must be one of {allowed_types}')
-        return v
-    
-    @field_validator('threshold')
-    @classmethod
-    def validate_threshold(cls, v):
-        if not isinstance(v, (int, float)):
-            raise ValueError('threshold must be a number')
-        return float(v)
 
 
 class UpdateMetricRequest(BaseModel):
     threshold: float
-    
-    @field_validator('threshold')
-    @classmethod
-    def validate_threshold(cls, v):
-        if not isinstance(v, (int, float)):
-            raise ValueError('threshold must be a number')
-        return float(v)
 
 
 class BestPromptInfo(BaseModel):
@@ -57,8 +37,13 @@ class BestPromptInfo(BaseModel):
     result_count: int
 
 
+class BestPromptConfigEntry(BaseModel):
+    config_id: int
+    info: Optional[BestPromptInfo]
+
+
 class BestPromptsResponse(BaseModel):
     human_annotation: Optional[BestPromptInfo] = None
-    judge_configs: Dict[int, Optional[BestPromptInfo]]
-    function_eval_configs: Dict[int, Optional[BestPromptInfo]]
+    judge_configs: List[BestPromptConfigEntry]
+    function_eval_configs: List[BestPromptConfigEntry]
 
@@ -1,12 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import Optional
 
 
-class PromptResponse(BaseModel):
+class PromptSummaryResponse(BaseModel):
+    """Prompt metadata without the system prompt body, for list views"""
     id: int
     name: Optional[str] = None
-    system_prompt: str
     user_message_column: Optional[str] = None
     csv_file_id: Optional[int] = None
     version: int
@@ -19,30 +19,34 @@ class PromptResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    # Frozen: instances are cached and shared between requests
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
+class PromptResponse(PromptSummaryResponse):
+    system_prompt: str
 
 
 class CreatePromptRequest(BaseModel):
-    name: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=128)
     system_prompt: str
     user_message_column: Optional[str] = None
     csv_file_id: Optional[int] = None
     commit_message: Optional[str] = None
     parent_prompt_id: Optional[int] = None  # If provided, creates a new version
-    model: Optional[str] = None
+    model: Optional[str] = Field(None, max_length=255)
     temperature: Optional[float] = None
     max_tokens: Optional[int] = None
     concurrency: Optional[int] = None
 
 
 class UpdatePromptRequest(BaseModel):
-    name: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=128)
     system_prompt: Optional[str] = None
     user_message_column: Optional[str] = None
     csv_file_id: Optional[int] = None
     commit_message: Optional[str] = None
-    model: Optional[str] = None
+    model: Optional[str] = Field(None, max_length=255)
     temperature: Optional[float] = None
     max_tokens: Optional[int] = None
     concurrency: Optional[int] = None
@@ -51,9 +55,9 @@ class UpdatePromptRequest(BaseModel):
 class CreateVersionRequest(BaseModel):
     system_prompt: str
     user_message_column: Optional[str] = None
-    name: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=128)
     commit_message: Optional[str] = None
-    model: Optional[str] = None
+    model: Optional[str] = Field(None, max_length=255)
     temperature: Optional[float] = None
     max_tokens: Optional[int] = None
     concurrency: Optional[int] = None
@@ -1,50 +1,126 @@
 """Service for running function-based evaluations."""
 
-from typing import Dict, Any, Optional, List
+from functools import lru_cache
+from types import ModuleType
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple, Union
 import sys
 import os
 
-# Add the evaluations package to the path
-# Assuming evaluations is at the repo root, same level as backend
-repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
-evaluations_path = os.path.join(repo_root, 'evaluations', 'src')
-if evaluations_path not in sys.path:
-    sys.path.insert(0, evaluations_path)
-
-try:
-    # Import from package root to trigger plugin registration via __init__.py
-    from evaluations import list_plugins, get_plugin, refresh_plugins
-    from evaluations.base import EvaluationContext, EvaluationResult
-except ImportError as e:
-    # If evaluations package isn't available, provide fallback
-    raise ImportError(
-        f"Failed to import evaluations package. Make sure it's installed or available at {evaluations_path}. "
-        f"Original error: {e}"
-    )
+import orjson
+
+if TYPE_CHECKING:
+    from evaluations import EvaluationPlugin
+
+
+@lru_cache(maxsize=None)
+def _evaluations() -> ModuleType:
+    """
+    Import the evaluations package on first use.
+    
+    Importing it discovers and registers every plugin, so that is deferred until
+    a function evaluation is actually listed, validated or run.
+    """
+    try:
+        # Import from package root to trigger plugin registration via __init__.py
+        from evaluations import get_plugin  # noqa: F401
+    except ImportError:
+        # Not installed (e.g. local development): use the source tree at the repo root,
+        # next to backend. sys.path is only touched when the installed package is missing.
+        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+        evaluations_path = os.path.join(repo_root, 'evaluations', 'src')
+        sys.path.insert(0, evaluations_path)
+        # Running from the repo root, 'evaluations' may already be cached as the bare
+        # top-level directory (a namespace package); drop it so the real one loads
+        sys.modules.pop('evaluations', None)
+        try:
+            from evaluations import get_plugin  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                f"Failed to import evaluations package. Make sure it's installed or available at {evaluations_path}. "
+                f"Original error: {e}"
+            )
+    return sys.modules['evaluations']
+
+
+# Resolved plugin instances by name, so per-row runs skip the registry.
+# refresh_plugins() re-instantiates every plugin, so refreshing clears this.
+_plugin_cache: Dict[str, "EvaluationPlugin"] = {}
+
+
+def _resolve_plugin(name: str) -> Optional["EvaluationPlugin"]:
+    """Return the registered plugin instance for name, or None if there isn't one"""
+    plugin = _plugin_cache.get(name)
+    if plugin is None:
+        plugin = _evaluations().get_plugin_or_none(name)
+        if plugin is not None:
+            _plugin_cache[name] = plugin
+    return plugin
+
+
+# Last plugin listing (and its JSON encoding) with the plugin directory fingerprint it was built from
+_plugins_listing: Optional[Tuple[Tuple[Tuple[str, int], ...], List[Dict[str, Any]], bytes]] = None
+_plugins_listing_lock = Lock()
+
+
+def _plugin_files_fingerprint(evaluations: ModuleType) -> Tuple[Tuple[str, int], ...]:
+    """(file name, mtime) of every plugin module, to detect added or edited plugins"""
+    plugin_dir = os.path.dirname(evaluations.plugins.__file__)
+    return tuple(sorted(
+        (entry.name, entry.stat().st_mtime_ns)
+        for entry in os.scandir(plugin_dir)
+        if entry.name.endswith('.py')
+    ))
+
+
+def invalidate_plugins_listing() -> None:
+    """Force the next listing to refresh the plugin registry"""
+    global _plugins_listing
+    _plugins_listing = None
 
 
 def list_function_evaluations() -> List[Dict[str, Any]]:
     """
     List all available function-based evaluation plugins.
     
-    This function refreshes the plugin registry before listing to ensure
-    newly added plugin files are discovered without restarting the backend.
+    The plugin registry is refreshed whenever a plugin file has been added,
+    removed or edited since the last listing, so new plugins are discovered
+    without restarting the backend; otherwise the previous listing is returned.
     
     Returns:
         List of dictionaries with plugin information (name, description)
     """
+    return _current_plugins_listing()[1]
+
+
+def list_function_evaluations_json() -> bytes:
+    """Same as list_function_evaluations, as JSON bytes encoded once per listing"""
+    return _current_plugins_listing()[2]
+
+
+def _current_plugins_listing() -> Tuple[Tuple[Tuple[str, int], ...], List[Dict[str, Any]], bytes]:
+    """Return the cached listing entry, rebuilding it if plugin files changed"""
+    global _plugins_listing
     try:
-        # Refresh plugins to discover any new plugin files
-        refresh_plugins()
-        
-        plugins = list_plugins()
-        return [
-            {
-                "name": plugin_info.name,
-                "description": plugin_info.description or "",
-            }
-            for plugin_info in plugins
-        ]
+        evaluations = _evaluations()
+        with _plugins_listing_lock:
+            fingerprint = _plugin_files_fingerprint(evaluations)
+            if _plugins_listing is not None and _plugins_listing[0] == fingerprint:
+                return _plugins_listing
+            
+            # Refresh plugins to discover any new or changed plugin files
+            evaluations.refresh_plugins()
+            _plugin_cache.clear()
+            
+            listing = [
+                {
+                    "name": plugin_info.name,
+                    "description": plugin_info.description or "",
+                }
+                for plugin_info in evaluations.list_plugins()
+            ]
+            _plugins_listing = (fingerprint, listing, orjson.dumps(listing))
+            return _plugins_listing
     except Exception as e:
         # Wrap any errors in a structured way
         raise RuntimeError(f"Failed to list function evaluations: {str(e)}")
@@ -63,11 +139,9 @@ def validate_function_name(function_name: str) -> bool:
     Raises:
         KeyError: If the function evaluation plugin is not found
     """
-    try:
-        get_plugin(function_name)
-        return True
-    except KeyError:
+    if _resolve_plugin(function_name) is None:
         raise KeyError(f"Function evaluation '{function_name}' not found")
+    return True
 
 
 def run_function_evaluation(
@@ -92,15 +166,67 @@ def run_function_evaluation(
         KeyError: If the evaluation plugin is not found
         RuntimeError: If the evaluation fails to run
     """
+    plugin = _get_plugin_for_run(name)
+    return _run_plugin(plugin, name, row, output, config)
+
+
+def run_function_evaluation_batch(
+    name: str,
+    rows: List[Dict[str, Any]],
+    outputs: List[Optional[str]],
+    config: Optional[Dict[str, Any]] = None
+) -> List[Union[Dict[str, Any], RuntimeError]]:
+    """
+    Run one function-based evaluation over many rows.
+    
+    The plugin is resolved once for the whole batch. A row whose evaluation
+    fails gets its RuntimeError in place of a result instead of failing the rest.
+    
+    Args:
+        name: Name of the evaluation plugin to run
+        rows: CSV row data dictionaries
+        outputs: The output to evaluate for each row (parallel to rows)
+        config: Optional configuration dictionary for the evaluation
+        
+    Returns:
+        One entry per row: a dictionary with 'score' and 'details', or the error
+        
+    Raises:
+        KeyError: If the evaluation plugin is not found
+        RuntimeError: If the plugin can't be loaded
+    """
+    plugin = _get_plugin_for_run(name)
+    results: List[Union[Dict[str, Any], RuntimeError]] = []
+    for row, output in zip(rows, outputs):
+        try:
+            results.append(_run_plugin(plugin, name, row, output, config))
+        except RuntimeError as e:
+            results.append(e)
+    return results
+
+
+def _get_plugin_for_run(name: str) -> "EvaluationPlugin":
+    """Resolve a plugin, wrapping lookup failures the way callers expect"""
     try:
-        plugin = get_plugin(name)
-    except KeyError as e:
-        raise KeyError(f"Function evaluation '{name}' not found: {e}")
+        plugin = _resolve_plugin(name)
     except Exception as e:
         raise RuntimeError(f"Failed to get plugin '{name}': {str(e)}")
     
+    if plugin is None:
+        raise KeyError(f"Function evaluation '{name}' not found")
+    return plugin
+
+
+def _run_plugin(
+    plugin: "EvaluationPlugin",
+    name: str,
+    row: Dict[str, Any],
+    output: Optional[str],
+    config: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Run a resolved plugin on one row, returning the result as a dictionary"""
     try:
-        context = EvaluationContext(
+        context = _evaluations().EvaluationContext(
             row=row,
             output=output,
             config=config or {}
@@ -117,4 +243,3 @@ def run_function_evaluation(
         raise RuntimeError(
             f"Error running function evaluation '{name}': {str(e)}"
         )
-
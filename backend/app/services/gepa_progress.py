@@ -1,50 +1,107 @@
 """Progress tracking for GEPA optimization"""
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 from threading import Lock
 from datetime import datetime, timezone
+from itertools import count
+import time
 
-# Global progress store: config_id -> progress dict
+# Global progress store: config_id -> progress dict. Entries are replaced, never
+# mutated, so readers can take one without locking; each config's lock only orders
+# that config's writers, so concurrent runs don't contend.
+# Timestamps are kept as epoch nanoseconds and only formatted when read. Every
+# write also takes a new sequence number, so readers can detect changes even when
+# two writes share a timestamp (clock granularity can be ~15 ms).
 _progress_store: Dict[int, Dict[str, Any]] = {}
-_progress_lock = Lock()
+_sequence = count(1)
+_INTERNAL_KEYS = frozenset({"started_at_ns", "updated_at_ns", "sequence"})
+_entry_locks: Dict[int, Lock] = {}
+_entry_locks_lock = Lock()
+
+
+def _entry_lock(config_id: int) -> Lock:
+    """Writer lock for one config, created on first use"""
+    lock = _entry_locks.get(config_id)
+    if lock is None:
+        with _entry_locks_lock:
+            lock = _entry_locks.setdefault(config_id, Lock())
+    return lock
+
+
+def _format_ts(ns: int) -> str:
+    """Format epoch nanoseconds as UTC ISO 8601 with a Z suffix (for JS compatibility)"""
+    seconds, remainder = divmod(ns, 1_000_000_000)
+    dt = datetime.fromtimestamp(seconds, timezone.utc).replace(microsecond=remainder // 1000)
+    return dt.isoformat().replace('+00:00', 'Z')
+
+
+def utc_now_iso() -> str:
+    """Current UTC time as ISO 8601 with a Z suffix (for JS compatibility)"""
+    return _format_ts(time.time_ns())
 
 
 def update_progress(config_id: int, **kwargs) -> None:
     """Update progress for a GEPA config"""
-    with _progress_lock:
-        if config_id not in _progress_store:
-            # Use UTC with Z suffix for JS compatibility
-            now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-            _progress_store[config_id] = {
+    # One timestamp per update: a new entry's started_at and updated_at match
+    now = time.time_ns()
+    with _entry_lock(config_id):
+        current = _progress_store.get(config_id)
+        if current is None:
+            current = {
                 "status": "running",
                 "current_iteration": 0,
                 "max_iterations": 0,
                 "current_score": None,
                 "best_score": None,
                 "message": "",
-                "updated_at": now,
-                "started_at": now,
+                "started_at_ns": now,
             }
         
-        _progress_store[config_id].update(kwargs)
-        _progress_store[config_id]["updated_at"] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        _progress_store[config_id] = {**current, **kwargs, "updated_at_ns": now, "sequence": next(_sequence)}
 
 
 def get_progress(config_id: int) -> Optional[Dict[str, Any]]:
-    """Get current progress for a GEPA config"""
-    with _progress_lock:
-        return _progress_store.get(config_id)
+    """Get current progress for a GEPA config, with ISO 8601 timestamps"""
+    versioned = get_progress_with_sequence(config_id)
+    return versioned[1] if versioned is not None else None
+
+
+def get_progress_with_sequence(config_id: int) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """
+    Get current progress with its sequence number, which changes on every write.
+    
+    Both come from the same entry, so a reader comparing sequence numbers never
+    pairs one update's number with another update's progress.
+    """
+    current = _progress_store.get(config_id)
+    if current is None:
+        return None
+    
+    progress = {k: v for k, v in current.items() if k not in _INTERNAL_KEYS}
+    progress["started_at"] = _format_ts(current["started_at_ns"])
+    progress["updated_at"] = _format_ts(current["updated_at_ns"])
+    return current["sequence"], progress
 
 
 def clear_progress(config_id: int) -> None:
     """Clear progress for a GEPA config"""
-    with _progress_lock:
+    with _entry_lock(config_id):
         _progress_store.pop(config_id, None)
 
 
+def _finish(config_id: int, **kwargs) -> None:
+    """Apply a terminal state to an existing entry; a cleared entry stays cleared"""
+    now = time.time_ns()
+    with _entry_lock(config_id):
+        current = _progress_store.get(config_id)
+        if current is None:
+            return
+        _progress_store[config_id] = {**current, **kwargs, "updated_at_ns": now, "sequence": next(_sequence)}
+
+
 def set_complete(config_id: int, final_score: float, message: str = "Optimization completed", new_prompt_id: Optional[int] = None) -> None:
     """Mark optimization as complete"""
-    update_progress(
-        config_id=config_id,
+    _finish(
+        config_id,
         status="completed",
         best_score=final_score,
         message=message,
@@ -54,9 +111,8 @@ def set_complete(config_id: int, final_score: float, message: str = "Optimizatio
 
 def set_error(config_id: int, error_message: str) -> None:
     """Mark optimization as failed"""
-    update_progress(
-        config_id=config_id,
+    _finish(
+        config_id,
         status="error",
         message=error_message
     )
-
@@ -5,7 +5,7 @@ nest_asyncio.apply()
 
 import random
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 from sqlalchemy.orm import Session
 
 try:
@@ -14,6 +14,7 @@ try:
 except ImportError:
     raise ImportError("gepa package not installed. Install it with: pip install gepa")
 
+from app.config import GEPA_MAX_CONCURRENCY
 from app.models.gepa import GepaConfig
 from app.models.prompt import Prompt
 from app.models.csv_data import CSVFile, CSVRow
@@ -23,7 +24,8 @@ from app.services.llm_service import llm_service
 from app.services.function_eval_service import run_function_evaluation
 from app.services.judge_service import run_judge_evaluation
 from app.services.gepa_progress import update_progress, set_complete, set_error, clear_progress
-from app.utils import parse_json_safe, get_root_prompt_id, get_next_prompt_version
+from app.utils import parse_json_safe, get_root_and_next_version
+from app.services.prompt_cache import invalidate_prompt_cache
 
 
 class EvalsBackedAdapter:
@@ -56,7 +58,8 @@ class EvalsBackedAdapter:
         self.db = db
         self.gepa_config = gepa_config
         self.csv_file = csv_file
-        self.available_columns = available_columns
+        self.available_columns = tuple(available_columns)
+        self.available_column_set = frozenset(available_columns)
         self.judge_configs = judge_configs
         self.function_eval_configs = function_eval_configs
         self.generator_model = generator_model
@@ -83,18 +86,23 @@ class EvalsBackedAdapter:
             # No running loop - safe to use asyncio.run() directly
             return asyncio.run(coro)
     
-    async def _generate_output(self, system_prompt: str, row_data: Dict[str, Any], user_message_column: Optional[str] = None) -> str:
-        """Generate output using the system prompt and row data with chat format"""
+    async def _generate_output(
+        self,
+        render_system_prompt: Callable[[Dict[str, Any]], str],
+        row_data: Dict[str, Any],
+        user_message_column: Optional[str] = None
+    ) -> str:
+        """Generate output using the compiled system prompt and row data with chat format"""
         try:
             # Render the system prompt template with row data
-            rendered_system_prompt = llm_service.render_prompt(system_prompt, row_data, self.available_columns)
+            rendered_system_prompt = render_system_prompt(row_data)
             if not rendered_system_prompt or not rendered_system_prompt.strip():
-                raise ValueError(f"Rendered system prompt is empty. Original prompt: {system_prompt[:100]}...")
+                raise ValueError("Rendered system prompt is empty")
             
             # Get user message from the specified column if provided
             user_message = ""
             if user_message_column:
-                if user_message_column not in self.available_columns:
+                if user_message_column not in self.available_column_set:
                     raise ValueError(f"User message column '{user_message_column}' not found in available columns")
                 user_message = str(row_data.get(user_message_column, ""))
                 if not user_message.strip():
@@ -119,7 +127,7 @@ class EvalsBackedAdapter:
     async def _evaluate_single_item(
         self,
         item: Dict[str, Any],
-        system_prompt: str,
+        render_system_prompt: Callable[[Dict[str, Any]], str],
         capture_traces: bool
     ) -> tuple[str, float, Dict[str, Any], str]:
         """Evaluate a single input item asynchronously"""
@@ -128,7 +136,7 @@ class EvalsBackedAdapter:
         
         # 1) Generate output
         try:
-            summary = await self._generate_output(system_prompt, row_data, self.user_message_column)
+            summary = await self._generate_output(render_system_prompt, row_data, self.user_message_column)
             if not summary or not summary.strip():
                 return "", 0.0, {}, "Generation returned empty output"
         except Exception as e:
@@ -161,19 +169,13 @@ class EvalsBackedAdapter:
                 error_detail = f"{str(e)}"
                 return f"judge_{judge_config.name}", 0.0, f"Judge '{judge_config.name}' Failed: {error_detail}"
         
-        # Wait for all judge evaluations in parallel
-        if self.judge_configs:
-            judge_tasks = [evaluate_judge(jc) for jc in self.judge_configs]
-            judge_results = await asyncio.gather(*judge_tasks)
-            for key, score, feedback in judge_results:
-                grader_scores[key] = score
-                all_scores.append(score)
-                feedback_parts.append(feedback)
-        
-        # Run function eval configs (synchronous, but fast)
-        for function_eval_config in self.function_eval_configs:
+        # Run function eval configs in worker threads so plugin work doesn't block the loop
+        async def evaluate_function(function_eval_config):
+            """Evaluate a single function eval config"""
+            key = f"function_{function_eval_config.name}"
             try:
-                result_dict = run_function_evaluation(
+                result_dict = await asyncio.to_thread(
+                    run_function_evaluation,
                     name=function_eval_config.function_name,
                     row=row_data,
                     output=summary,
@@ -182,19 +184,22 @@ class EvalsBackedAdapter:
                 if "score" not in result_dict:
                     raise ValueError(f"No score in result: {result_dict}")
                 score = float(result_dict["score"])
-                grader_scores[f"function_{function_eval_config.name}"] = score
-                all_scores.append(score)
                 
                 details = result_dict.get("details", {})
                 details_str = f" Details: {details}" if details else ""
-                feedback_parts.append(f"Function '{function_eval_config.name}' (Score: {score:.3f}){details_str}")
+                return key, score, f"Function '{function_eval_config.name}' (Score: {score:.3f}){details_str}"
             except Exception as e:
-                import traceback
                 error_detail = f"{str(e)}"
-                score = 0.0
-                grader_scores[f"function_{function_eval_config.name}"] = score
+                return key, 0.0, f"Function '{function_eval_config.name}' Failed: {error_detail}"
+        
+        # Run all graders for this row concurrently (judges first, then function evals, in feedback order)
+        grader_tasks = [evaluate_judge(jc) for jc in self.judge_configs]
+        grader_tasks.extend(evaluate_function(fec) for fec in self.function_eval_configs)
+        if grader_tasks:
+            for key, score, feedback in await asyncio.gather(*grader_tasks):
+                grader_scores[key] = score
                 all_scores.append(score)
-                feedback_parts.append(f"Function '{function_eval_config.name}' Failed: {error_detail}")
+                feedback_parts.append(feedback)
         
         # 3) Calculate combined score
         scalar = sum(all_scores) / len(all_scores) if all_scores else 0.0
@@ -230,23 +235,34 @@ class EvalsBackedAdapter:
             EvaluationBatch with scores, outputs, and trajectories
         """
         system_prompt = candidate["system_prompt"]
+        max_concurrency = GEPA_MAX_CONCURRENCY
         
         # Update progress: starting evaluation
         self._evaluation_count += 1
         update_progress(
             self.config_id,
-            message=f"Evaluating candidate {self._evaluation_count} on {len(inputs)} examples..."
+            message=f"Evaluating candidate {self._evaluation_count} on {len(inputs)} examples "
+                    f"(up to {max_concurrency} at a time)..."
         )
         
-        # Evaluate all items (using async batching for efficiency)
+        # Evaluate all items concurrently, capping in-flight rows so large sets don't hit rate limits
         async def evaluate_all():
-            tasks = [
-                self._evaluate_single_item(item, system_prompt, capture_traces)
-                for item in inputs
-            ]
-            return await asyncio.gather(*tasks)
+            semaphore = asyncio.Semaphore(max_concurrency)
+            
+            async def bounded(item):
+                async with semaphore:
+                    return await self._evaluate_single_item(item, render_system_prompt, capture_traces)
+            
+            return await asyncio.gather(*(bounded(item) for item in inputs))
         
-        results = self._run_async(evaluate_all())
+        # Parse and validate the candidate template once for all rows
+        try:
+            render_system_prompt = llm_service.compile_prompt(system_prompt, self.available_columns)
+        except ValueError as e:
+            # Every row would fail the same way, so skip generation entirely
+            results = [("", 0.0, {}, f"Generation failed: {str(e)}")] * len(inputs)
+        else:
+            results = self._run_async(evaluate_all())
         
         # Unpack results and calculate scores
         scores: List[float] = []
@@ -333,7 +349,7 @@ async def run_gepa(
     )
     
     # Get CSV file and columns
-    csv_file = db.query(CSVFile).filter(CSVFile.id == csv_file_id).first()
+    csv_file = db.get(CSVFile, csv_file_id)
     if not csv_file:
         raise ValueError(f"CSV file {csv_file_id} not found")
     
@@ -343,7 +359,7 @@ async def run_gepa(
     if not gepa_config.base_prompt_id:
         raise ValueError("Base prompt is required for GEPA optimization. Please select a prompt to optimize.")
     
-    base_prompt = db.query(Prompt).filter(Prompt.id == gepa_config.base_prompt_id).first()
+    base_prompt = db.get(Prompt, gepa_config.base_prompt_id)
     if not base_prompt:
         raise ValueError(f"Base prompt {gepa_config.base_prompt_id} not found")
     
@@ -354,19 +370,9 @@ async def run_gepa(
     
     user_message_column = base_prompt.user_message_column
     
-    # Get judge configs
-    judge_configs = []
-    if gepa_config.judge_config_ids:
-        judge_configs = db.query(JudgeConfig).filter(
-            JudgeConfig.id.in_(gepa_config.judge_config_ids)
-        ).all()
-    
-    # Get function eval configs
-    function_eval_configs = []
-    if gepa_config.function_eval_config_ids:
-        function_eval_configs = db.query(FunctionEvalConfig).filter(
-            FunctionEvalConfig.id.in_(gepa_config.function_eval_config_ids)
-        ).all()
+    # Evaluation configs (loaded with the GEPA config)
+    judge_configs = list(gepa_config.judge_configs)
+    function_eval_configs = list(gepa_config.function_eval_configs)
     
     if not judge_configs and not function_eval_configs:
         raise ValueError("At least one judge config or function eval config must be provided")
@@ -487,15 +493,13 @@ async def run_gepa(
         raise
     
     # Create new prompt version (base_prompt_id is always required now)
-    root_prompt_id = get_root_prompt_id(db, gepa_config.base_prompt_id)
+    root_prompt_id, version = get_root_and_next_version(db, gepa_config.base_prompt_id)
     
     # Get the root prompt to inherit its name
-    root_prompt = db.query(Prompt).filter(Prompt.id == root_prompt_id).first()
+    root_prompt = db.get(Prompt, root_prompt_id)
     if not root_prompt:
         raise ValueError(f"Root prompt {root_prompt_id} not found")
     
-    version = get_next_prompt_version(db, root_prompt_id)
-    
     # Ensure we have the optimized prompt content (use best_prompt from GEPA result)
     # Do NOT use seed_prompt_content here - we want the optimized version
     # best_prompt should already be validated and non-empty at this point
@@ -514,6 +518,7 @@ async def run_gepa(
     try:
         db.add(new_prompt)
         db.commit()
+        invalidate_prompt_cache()
         db.refresh(new_prompt)
     except Exception as e:
         db.rollback()
@@ -521,7 +526,7 @@ async def run_gepa(
     
     # Verify the content was saved correctly
     new_prompt_id = new_prompt.id
-    saved_prompt = db.query(Prompt).filter(Prompt.id == new_prompt_id).first()
+    saved_prompt = db.get(Prompt, new_prompt_id)
     if not saved_prompt:
         raise ValueError("Failed to retrieve saved prompt from database")
     
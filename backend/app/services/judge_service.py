@@ -1,5 +1,5 @@
 """Service for running judge evaluations."""
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Collection, Optional, Tuple
 from app.services.llm_service import llm_service
 from app.models.judge import JudgeConfig
 
@@ -7,7 +7,8 @@ async def run_judge_evaluation(
     judge_config: JudgeConfig,
     row_data: Dict[str, Any],
     output: str,
-    available_columns: List[str]
+    available_columns: Collection[str],
+    cache: Optional[bool] = None
 ) -> Tuple[float, str]:
     """
     Run a judge evaluation on a specific output.
@@ -17,6 +18,7 @@ async def run_judge_evaluation(
         row_data: The original row data
         output: The output to evaluate
         available_columns: List of available columns in the row data
+        cache: Passed through to the LLM completion cache (None = cache deterministic calls)
         
     Returns:
         Tuple containing (score, raw_output)
@@ -29,9 +31,10 @@ async def run_judge_evaluation(
     row_data_with_output = dict(row_data)
     row_data_with_output["Output"] = output
     
-    available_cols_with_output = list(available_columns)
+    # Keep the CSV's column order (a tuple) so error messages list columns as in the file
+    available_cols_with_output = tuple(available_columns)
     if "Output" not in available_cols_with_output:
-        available_cols_with_output.append("Output")
+        available_cols_with_output += ("Output",)
     
     # Build the complete judge prompt
     complete_prompt = llm_service.build_judge_prompt(
@@ -45,7 +48,10 @@ async def run_judge_evaluation(
         complete_prompt,
         model=judge_config.model,
         temperature=judge_config.temperature,
-        max_completion_tokens=judge_config.max_tokens
+        max_completion_tokens=judge_config.max_tokens,
+        cache=cache,
+        # Only cache replies with a readable score, so a bad reply isn't replayed
+        validate=llm_service.parse_judge_score
     )
     
     if not raw_output or not raw_output.strip():
@@ -0,0 +1,149 @@
+"""Response cache for deterministic LLM completions"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES
+from app.database import SessionLocal
+from app.models.llm_cache import LLMCacheEntry
+
+
+class LLMCache:
+    """
+    Exact-match cache of LLM outputs keyed by a hash of model, params and messages.
+    
+    Hot entries live in an in-process LRU; every entry is also written to the
+    cache_entries table so it survives restarts. Persistence is best-effort:
+    database errors are treated as cache misses. Database work runs in a worker
+    thread so it never blocks the event loop, and expired rows are purged at
+    most once per PURGE_INTERVAL_SECONDS.
+    """
+    
+    PURGE_INTERVAL_SECONDS = 3600
+    
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl_seconds: float = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at epoch seconds, output), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # GEPA runs in a worker thread and shares this cache with the API event loop
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        # Startup purges once (see main.py); stores purge again once the interval passes
+        self._next_purge_at = time.time() + self.PURGE_INTERVAL_SECONDS
+    
+    def _remember(self, key: str, output: str, expires_at: float) -> None:
+        """Store an entry in the in-process LRU, evicting the least recently used"""
+        with self._lock:
+            self._entries[key] = (expires_at, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached output for key, or None on a miss or expired entry"""
+        output = self._lookup_memory(key)
+        if output is None:
+            # Fall back to the persistent tier, off the event loop
+            output = await asyncio.to_thread(self._load_persisted, key)
+        self._record(output is not None)
+        return output
+    
+    def _lookup_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, output = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return output
+            del self._entries[key]
+            return None
+    
+    def _load_persisted(self, key: str) -> Optional[str]:
+        """Read an entry from the database into the in-process LRU (blocking)"""
+        db = SessionLocal()
+        try:
+            row = db.get(LLMCacheEntry, key)
+            if row is None:
+                return None
+            if row.expires_at <= datetime.now():
+                db.delete(row)
+                db.commit()
+                return None
+            output, expires_at = row.output, row.expires_at.timestamp()
+        except SQLAlchemyError:
+            db.rollback()
+            return None
+        finally:
+            db.close()
+        
+        self._remember(key, output, expires_at)
+        return output
+    
+    async def set(self, key: str, output: str) -> None:
+        """Cache output for key in memory and in the database"""
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, output, expires_at)
+        await asyncio.to_thread(self._persist, key, output, expires_at)
+    
+    def _persist(self, key: str, output: str, expires_at: float) -> None:
+        """Write an entry to the database, purging expired rows when due (blocking)"""
+        db = SessionLocal()
+        try:
+            db.merge(LLMCacheEntry(key=key, output=output, expires_at=datetime.fromtimestamp(expires_at)))
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+        finally:
+            db.close()
+        
+        now = time.time()
+        with self._lock:
+            purge_due = now >= self._next_purge_at
+            if purge_due:
+                self._next_purge_at = now + self.PURGE_INTERVAL_SECONDS
+        if purge_due:
+            self.purge_expired()
+    
+    def purge_expired(self) -> int:
+        """Delete expired rows from the database, returning how many were removed (blocking)"""
+        db = SessionLocal()
+        try:
+            deleted = db.query(LLMCacheEntry).filter(LLMCacheEntry.expires_at <= datetime.now()).delete()
+            db.commit()
+            return deleted
+        except SQLAlchemyError:
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since startup and the current in-memory size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+# Global instance
+llm_cache = LLMCache()
@@ -1,8 +1,14 @@
 import re
-from typing import Dict, Any, Optional, List
+import orjson
+import random
+import hashlib
+from functools import lru_cache, partial
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable, Collection, AsyncIterator
 import os
 from litellm import acompletion
 import litellm
+from app.utils import SingleFlight
+from app.services.llm_cache import llm_cache
 
 # Disable LiteLLM callbacks and telemetry to prevent logging worker timeouts
 os.environ["LITELLM_TELEMETRY"] = "FALSE"
@@ -10,6 +16,98 @@ litellm.success_callback = []
 litellm.failure_callback = []
 litellm.callbacks = []
 
+# Backoff between LLM retries: full jitter spreads retries from concurrent
+# callers out so a burst that hit a 429/5xx doesn't retry in lockstep
+RETRY_BACKOFF_BASE_SECONDS = 0.5
+RETRY_BACKOFF_MAX_SECONDS = 8.0
+
+
+def retry_backoff_delay(attempt: int) -> float:
+    """Seconds to wait before retrying after the given (0-based) failed attempt"""
+    ceiling = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+_TEMPLATE_VAR_PATTERN = re.compile(r'\{\{([^}]+)\}\}')
+
+
+@lru_cache(maxsize=512)
+def _compile_template(prompt_template: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Split a template into its literal segments and {{variable}} names.
+    
+    Templates are parsed once and reused for every row they're rendered against.
+    There is always one more literal segment than variable names.
+    """
+    parts = _TEMPLATE_VAR_PATTERN.split(prompt_template)
+    literals = tuple(parts[0::2])
+    names = tuple(name.strip() for name in parts[1::2])
+    return literals, names
+
+
+# Sized so templates abandoned while editing a prompt age out instead of accumulating
+@lru_cache(maxsize=512)
+def _missing_columns(prompt_template: str, available_columns: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Template variables not in available_columns, computed once per (template, column list)"""
+    _, names = _compile_template(prompt_template)
+    column_set = frozenset(available_columns)
+    return tuple(name for name in names if name not in column_set)
+
+
+def _check_template_columns(
+    prompt_template: str,
+    column_names_in_template: Tuple[str, ...],
+    available_columns: Optional[Collection[str]]
+) -> None:
+    """Raise ValueError if the template references columns outside available_columns"""
+    if available_columns is None:
+        return
+    
+    if isinstance(available_columns, tuple):
+        missing_columns = _missing_columns(prompt_template, available_columns)
+    else:
+        missing_columns = [col for col in column_names_in_template if col not in available_columns]
+    if missing_columns:
+        if isinstance(available_columns, (set, frozenset)):
+            available_columns = sorted(available_columns)
+        raise ValueError(
+            f"Prompt template references columns that don't exist: {', '.join(missing_columns)}. "
+            f"Available columns: {', '.join(available_columns)}"
+        )
+
+
+def _render_compiled(literals: Tuple[str, ...], column_names: Tuple[str, ...], row_data: Dict[str, Any]) -> str:
+    """Interleave literal segments with row values, defaulting missing ones to empty string"""
+    rendered = [literals[0]]
+    for var_name, literal in zip(column_names, literals[1:]):
+        rendered.append(str(row_data.get(var_name, "")))
+        rendered.append(literal)
+    return "".join(rendered)
+
+
+@lru_cache(maxsize=128)
+def _supports_cache_control(model: str) -> bool:
+    """Whether the model's provider takes explicit cache_control breakpoints (Anthropic)"""
+    return model.startswith(("anthropic/", "claude-")) or model in litellm.anthropic_models
+
+
+def _with_prompt_caching(model: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Mark the system message as a prompt-cache breakpoint for providers that need it.
+    
+    OpenAI and Gemini cache repeated prompt prefixes automatically; Anthropic only
+    caches up to an explicit cache_control marker. The system prompt is the part
+    shared across rows, so any change to it starts a new cache entry.
+    """
+    if not _supports_cache_control(model) or not messages or messages[0]["role"] != "system":
+        return messages
+    system_message = {
+        "role": "system",
+        "content": [{"type": "text", "text": messages[0]["content"], "cache_control": {"type": "ephemeral"}}],
+    }
+    return [system_message] + messages[1:]
+
+
 JUDGE_PROMPT_PREFIX = """You are an expert evaluator tasked with assessing outputs according to specific criteria. Your role is to provide objective, consistent, and well-reasoned evaluations.
 
 ## What You're Evaluating
@@ -62,11 +160,66 @@ Begin your evaluation of the output now.
 class LLMService:
     """Service for interacting with LLM providers via LiteLLM"""
     
+    def __init__(self):
+        # Concurrent calls with the same cache key share one provider request
+        self._inflight = SingleFlight()
+    
+    @staticmethod
+    def _cache_key(model: str, temperature: float, max_tokens: int, messages: List[Dict[str, str]]) -> str:
+        """Hash everything that determines the completion into a stable cache key"""
+        payload = orjson.dumps(
+            {"m": model, "t": temperature, "n": max_tokens, "msgs": messages},
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.blake2b(payload, digest_size=32).hexdigest()
+    
+    async def _cached_call(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[str]],
+        use_cache: bool,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """
+        Return a cached output for key, or run call() once and cache its result.
+        
+        Concurrent callers with the same key on the same event loop share a single
+        in-flight LLM request instead of each hitting the provider.
+        
+        If validate is given, only outputs it accepts (doesn't raise ValueError for)
+        are cached or served from the cache, so a retry after a rejected output
+        makes a fresh call and caches that instead.
+        """
+        if not use_cache:
+            return await call()
+        
+        def is_valid(output: str) -> bool:
+            if validate is None:
+                return True
+            try:
+                validate(output)
+            except ValueError:
+                return False
+            return True
+        
+        cached = await llm_cache.get(key)
+        if cached is not None and is_valid(cached):
+            return cached
+        
+        async def call_and_store() -> str:
+            output = await call()
+            # Don't cache empty or rejected outputs so callers can retry them
+            if output and is_valid(output):
+                await llm_cache.set(key, output)
+            return output
+        
+        return await self._inflight.do(key, call_and_store)
+    
     def render_prompt(
         self, 
         prompt_template: str, 
         row_data: Dict[str, Any], 
-        available_columns: Optional[List[str]] = None
+        available_columns: Optional[Collection[str]] = None
     ) -> str:
         """
         Render a prompt template by replacing {{variable}} placeholders with actual values.
@@ -74,7 +227,9 @@ class LLMService:
         Args:
             prompt_template: Template string with {{variable}} syntax
             row_data: Dictionary of column names to values
-            available_columns: Optional list of available column names for validation
+            available_columns: Optional available column names for validation
+                (pass the ordered tuple from parse_columns: the check is cached per
+                template and column list, and error messages keep the CSV's column order)
         
         Returns:
             Rendered prompt string
@@ -82,28 +237,31 @@ class LLMService:
         Raises:
             ValueError: If a column name in the template doesn't exist in available_columns
         """
-        # Extract all column names from the template
-        column_names_in_template = re.findall(r'\{\{([^}]+)\}\}', prompt_template)
-        column_names_in_template = [name.strip() for name in column_names_in_template]
-        
-        # Validate column names if available_columns is provided
-        if available_columns is not None:
-            missing_columns = [col for col in column_names_in_template if col not in available_columns]
-            if missing_columns:
-                raise ValueError(
-                    f"Prompt template references columns that don't exist: {', '.join(missing_columns)}. "
-                    f"Available columns: {', '.join(available_columns)}"
-                )
-        
-        def replace_var(match):
-            var_name = match.group(1).strip()
-            # Get the value from row_data, default to empty string if not found
-            value = str(row_data.get(var_name, ""))
-            return value
-        
-        # Replace all {{variable}} patterns
-        rendered = re.sub(r'\{\{([^}]+)\}\}', replace_var, prompt_template)
-        return rendered
+        literals, column_names_in_template = _compile_template(prompt_template)
+        _check_template_columns(prompt_template, column_names_in_template, available_columns)
+        return _render_compiled(literals, column_names_in_template, row_data)
+    
+    def compile_prompt(
+        self,
+        prompt_template: str,
+        available_columns: Optional[Collection[str]] = None
+    ) -> Callable[[Dict[str, Any]], str]:
+        """
+        Parse and validate a template once, returning a renderer for many rows.
+        
+        Args:
+            prompt_template: Template string with {{variable}} syntax
+            available_columns: Optional available column names for validation
+        
+        Returns:
+            A function rendering the template for one row's data (as render_prompt would)
+        
+        Raises:
+            ValueError: If a column name in the template doesn't exist in available_columns
+        """
+        literals, column_names_in_template = _compile_template(prompt_template)
+        _check_template_columns(prompt_template, column_names_in_template, available_columns)
+        return partial(_render_compiled, literals, column_names_in_template)
     
     async def completion(
         self,
@@ -111,6 +269,8 @@ class LLMService:
         model: str,
         temperature: Optional[float] = None,
         max_completion_tokens: Optional[int] = None,
+        cache: Optional[bool] = None,
+        validate: Optional[Callable[[str], Any]] = None,
     ) -> str:
         """
         Get a completion from the LLM via LiteLLM (legacy method for backward compatibility).
@@ -120,6 +280,10 @@ class LLMService:
             model: Any LiteLLM-supported model ID (e.g., 'gpt-4', 'azure/gpt-4', 'gemini/gemini-pro')
             temperature: Temperature setting (defaults to 1.0)
             max_completion_tokens: Maximum tokens to generate (defaults to 2000)
+            cache: Force (True) or bypass (False) the response cache. By default only
+                deterministic calls (temperature 0) are cached.
+            validate: Optional check raising ValueError for outputs that must not be
+                cached (e.g. parse_judge_score for judge replies)
         
         Returns:
             The complete response text from the LLM
@@ -128,21 +292,28 @@ class LLMService:
         final_temperature = temperature if temperature is not None else 1.0
         final_max_tokens = max_completion_tokens if max_completion_tokens is not None else 2000
         
-        # Call LiteLLM directly - it handles everything!
-        response = await acompletion(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=final_temperature,
-            max_tokens=final_max_tokens,
-        )
+        messages = [{"role": "user", "content": prompt}]
         
-        # Extract text from response
-        if response and response.choices and len(response.choices) > 0:
-            choice = response.choices[0]
-            if choice.message and choice.message.content:
-                return choice.message.content
+        async def call() -> str:
+            # Call LiteLLM directly - it handles everything!
+            response = await acompletion(
+                model=model,
+                messages=messages,
+                temperature=final_temperature,
+                max_tokens=final_max_tokens,
+            )
+            
+            # Extract text from response
+            if response and response.choices and len(response.choices) > 0:
+                choice = response.choices[0]
+                if choice.message and choice.message.content:
+                    return choice.message.content
+            
+            return ""
         
-        return ""
+        use_cache = cache if cache is not None else final_temperature == 0
+        key = self._cache_key(model, final_temperature, final_max_tokens, messages)
+        return await self._cached_call(key, call, use_cache, validate)
     
     async def chat_completion(
         self,
@@ -151,6 +322,7 @@ class LLMService:
         model: str,
         temperature: Optional[float] = None,
         max_completion_tokens: Optional[int] = None,
+        cache: Optional[bool] = None,
     ) -> str:
         """
         Get a completion from the LLM using chat format with system and user messages.
@@ -161,6 +333,8 @@ class LLMService:
             model: Any LiteLLM-supported model ID (e.g., 'gpt-4', 'azure/gpt-4', 'gemini/gemini-pro')
             temperature: Temperature setting (defaults to 1.0)
             max_completion_tokens: Maximum tokens to generate (defaults to 2000)
+            cache: Force (True) or bypass (False) the response cache. By default only
+                deterministic calls (temperature 0) are cached.
         
         Returns:
             The complete response text from the LLM
@@ -183,29 +357,96 @@ class LLMService:
         if not messages:
             return ""
         
-        # Call LiteLLM with chat format
+        async def call() -> str:
+            # Call LiteLLM with chat format
+            response = await acompletion(
+                model=model,
+                messages=_with_prompt_caching(model, messages),
+                temperature=final_temperature,
+                max_tokens=final_max_tokens,
+            )
+            
+            # Extract text from response
+            if response and response.choices and len(response.choices) > 0:
+                choice = response.choices[0]
+                if choice.message and choice.message.content:
+                    content = choice.message.content
+                    if content and content.strip():
+                        return content.strip()
+            
+            return ""
+        
+        use_cache = cache if cache is not None else final_temperature == 0
+        key = self._cache_key(model, final_temperature, final_max_tokens, messages)
+        return await self._cached_call(key, call, use_cache)
+    
+    async def stream_chat_completion(
+        self,
+        system_prompt: str,
+        user_message: str,
+        model: str,
+        temperature: Optional[float] = None,
+        max_completion_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion from the LLM, yielding text deltas as they arrive.
+        
+        Uses the same defaults and message layout as chat_completion. A cached
+        output for the same request is yielded as a single delta, and deterministic
+        (temperature 0) outputs are cached once the stream completes.
+        
+        Yields:
+            Chunks of response text, in order
+        """
+        final_temperature = temperature if temperature is not None else 1.0
+        final_max_tokens = max_completion_tokens if max_completion_tokens is not None else 2000
+        if final_max_tokens < 1:
+            final_max_tokens = 2000
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        if user_message:
+            messages.append({"role": "user", "content": user_message})
+        
+        if not messages:
+            return
+        
+        use_cache = final_temperature == 0
+        key = self._cache_key(model, final_temperature, final_max_tokens, messages)
+        if use_cache:
+            cached = await llm_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
         response = await acompletion(
             model=model,
-            messages=messages,
+            messages=_with_prompt_caching(model, messages),
             temperature=final_temperature,
             max_tokens=final_max_tokens,
+            stream=True,
         )
         
-        # Extract text from response
-        if response and response.choices and len(response.choices) > 0:
-            choice = response.choices[0]
-            if choice.message and choice.message.content:
-                content = choice.message.content
-                if content and content.strip():
-                    return content.strip()
+        chunks = []
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta and delta.content:
+                chunks.append(delta.content)
+                yield delta.content
         
-        return ""
+        # Match chat_completion, which caches the stripped output
+        output = "".join(chunks).strip()
+        if use_cache and output:
+            await llm_cache.set(key, output)
     
     def build_judge_prompt(
         self,
         core_prompt: str,
         row_data: Dict[str, Any],
-        available_columns: Optional[List[str]] = None
+        available_columns: Optional[Collection[str]] = None
     ) -> str:
         """
         Build a complete judge prompt by wrapping the core prompt with prefix and suffix,
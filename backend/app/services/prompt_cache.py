@@ -0,0 +1,58 @@
+"""Short-lived caches of prompt read responses and prompt templates"""
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.prompt import Prompt
+from app.utils import TTLCache
+
+# JSON bodies for the prompt GET endpoints. Keys mix prompt IDs, CSV file IDs and
+# flags, so any prompt write clears the whole cache rather than guessing which
+# entries it affects.
+_prompt_cache = TTLCache(maxsize=1024, ttl=30)
+
+# prompt ID -> (system_prompt, user_message_column). Runs are issued once per CSV
+# row, so the same prompt would otherwise be re-read for every row of a run.
+_prompt_template_cache = TTLCache(maxsize=1024, ttl=30)
+
+
+def cached_prompt_response(key: Hashable, load: Callable[[], Any]) -> Response:
+    """
+    Return the cached JSON response for key, or load() and cache it.
+    
+    load() returns response models (or lists/dicts of them); they are serialized
+    once by pydantic-core and cache hits skip validation and encoding entirely.
+    """
+    content = _prompt_cache.get(key)
+    if content is None:
+        content = to_json(load())
+        _prompt_cache.set(key, content)
+    return Response(content=content, media_type="application/json")
+
+
+def get_prompt_template_or_404(db: Session, prompt_id: int) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return the saved (system_prompt, user_message_column) for a prompt.
+    
+    Only those two columns are loaded, and they are cached per prompt ID so
+    repeated runs against one prompt skip the database entirely.
+    """
+    template = _prompt_template_cache.get(prompt_id)
+    if template is None:
+        row = db.execute(
+            select(Prompt.system_prompt, Prompt.user_message_column).where(Prompt.id == prompt_id)
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Prompt not found")
+        template = (row.system_prompt, row.user_message_column)
+        _prompt_template_cache.set(prompt_id, template)
+    return template
+
+
+def invalidate_prompt_cache() -> None:
+    """Drop all cached prompt data; call after committing any prompt write"""
+    _prompt_cache.clear()
+    _prompt_template_cache.clear()
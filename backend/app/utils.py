@@ -1,20 +1,34 @@
 """Common utility functions"""
-import json
-from typing import Dict, Any, List, Optional, TypeVar, Type, Union
-from sqlalchemy.orm import Session
-from fastapi import HTTPException
-from sqlalchemy import func
+import time
+import asyncio
+import hashlib
+import orjson
+from collections import OrderedDict
+from threading import Lock
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, TypeVar, Type, Union, Tuple, FrozenSet, Callable, Awaitable, Hashable
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.util import identity_key
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import JSON, column, exists, func, insert, inspect, null, or_, select, table, union_all, update
 from app.models.prompt import Prompt
+from app.models.csv_data import CSVRow, CSVFile
+from app.models.judge import JudgeConfig
+from app.models.function_eval import FunctionEvalConfig
+from app.models.gepa import gepa_judge_configs, gepa_function_eval_configs
 
 T = TypeVar('T')
 
 
-def parse_json_safe(data: Optional[Union[str, Dict, List]], default: Optional[Any] = None) -> Any:
+def parse_json_safe(data: Optional[Union[str, bytes, Dict, List]], default: Optional[Any] = None) -> Any:
     """
     Safely parse JSON string, returning default if parsing fails.
     
+    Uses orjson, which parses str or bytes directly and is considerably faster
+    than the stdlib for large row payloads.
+    
     Args:
-        data: JSON string or already parsed data
+        data: JSON string/bytes or already parsed data
         default: Default value to return if parsing fails
         
     Returns:
@@ -23,11 +37,146 @@ def parse_json_safe(data: Optional[Union[str, Dict, List]], default: Optional[An
     if data is None:
         return default
     try:
-        return json.loads(data) if isinstance(data, str) else data
-    except (json.JSONDecodeError, TypeError):
+        return orjson.loads(data) if isinstance(data, (str, bytes)) else data
+    except (orjson.JSONDecodeError, TypeError):
         return default
 
 
+def parse_columns(columns: Optional[Union[str, List[str]]]) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    """
+    Normalize a CSV file's column list, cached per distinct list.
+    
+    Args:
+        columns: The CSVFile.columns value (a list, or a JSON string from
+            databases where the column predates the JSON type)
+        
+    Returns:
+        Tuple of (ordered column names for messages, frozenset for membership checks).
+        Both are empty if the columns can't be parsed.
+    """
+    # Lists aren't hashable, so key the cache on a tuple of the names
+    return _parse_columns(tuple(columns) if isinstance(columns, list) else columns)
+
+
+@lru_cache(maxsize=256)
+def _parse_columns(columns: Optional[Union[str, Tuple[str, ...]]]) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    if isinstance(columns, tuple):
+        return columns, frozenset(columns)
+    parsed = parse_json_safe(columns, None)
+    if not isinstance(parsed, list):
+        return (), frozenset()
+    return tuple(parsed), frozenset(parsed)
+
+
+def etag_response(request: Request, content: bytes, cache_control: str = "no-cache") -> Response:
+    """
+    Return JSON content with a content-hash ETag, or an empty 304 if the client has it.
+    
+    The default Cache-Control makes clients revalidate on every poll, so writes are
+    visible immediately while unchanged data costs only a 304.
+    
+    Args:
+        request: The incoming request (for If-None-Match)
+        content: Serialized JSON response body
+        cache_control: Cache-Control header value
+        
+    Returns:
+        A 200 JSON response, or a 304 response with no body
+    """
+    etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison, as for GET: W/ prefixes are ignored
+        client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after ttl seconds.
+    
+    Sync endpoints run in the threadpool, so reads and writes take a lock.
+    Callers are responsible for invalidating keys when the underlying rows change.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expires_at monotonic seconds, value), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+    
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key, or default on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache value for key, evicting the least recently used entries past maxsize"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Remove key from the cache, returning its value if present"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[1]
+    
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent async calls with the same key into a single execution.
+    
+    The first caller for a key starts the call as its own task; every caller,
+    including the first, awaits that task through a shield, so a cancelled
+    caller (e.g. a disconnected client) never cancels the run the others share.
+    Keys are scoped per event loop, since GEPA runs its own loop in a worker thread.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+    
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call() unless an identical call is already in flight, then share its result"""
+        loop = asyncio.get_running_loop()
+        inflight_key = (loop, key)
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            task = loop.create_task(call())
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda done: self._finish(inflight_key, done))
+        return await asyncio.shield(task)
+    
+    def _finish(self, inflight_key: Tuple[asyncio.AbstractEventLoop, Hashable], task: asyncio.Task) -> None:
+        """Forget a finished run so the next call for its key starts a new one"""
+        if self._inflight.get(inflight_key) is task:
+            del self._inflight[inflight_key]
+        if not task.cancelled():
+            # Mark any exception as retrieved so it isn't logged when every caller had gone
+            task.exception()
+
+
 def get_or_404(db: Session, model: Type[T], id: int, detail: str = "Resource not found") -> T:
     """
     Get a model instance by ID or raise 404.
@@ -44,72 +193,282 @@ def get_or_404(db: Session, model: Type[T], id: int, detail: str = "Resource not
     Raises:
         HTTPException: 404 if resource not found
     """
-    instance = db.query(model).filter(model.id == id).first()
-    if not instance:
+    # Session.get checks the identity map first and only queries on a miss
+    instance = db.get(model, id)
+    if instance is None:
         raise HTTPException(status_code=404, detail=detail)
     return instance
 
 
-def get_root_prompt_id(db: Session, prompt_id: int) -> int:
+def exists_or_404(db: Session, model: Type[T], id: int, detail: str = "Resource not found") -> None:
+    """
+    Check that a model instance exists by ID or raise 404.
+    
+    For validation that doesn't use the row: an EXISTS query reads no columns,
+    where get_or_404 would load the whole row (e.g. a prompt's system prompt or a
+    CSV file's column list). Rows already in the session need no query.
+    
+    Args:
+        db: Database session
+        model: SQLAlchemy model class
+        id: Primary key ID
+        detail: Error message if not found
+        
+    Raises:
+        HTTPException: 404 if resource not found
+    """
+    if db.identity_map.get(identity_key(model, id)) is not None:
+        return
+    if not db.query(exists().where(model.id == id)).scalar():
+        raise HTTPException(status_code=404, detail=detail)
+
+
+def get_row_with_file_or_404(db: Session, csv_row_id: int) -> Tuple[CSVRow, CSVFile]:
+    """
+    Get a CSV row together with its CSV file in a single query, or raise 404.
+    
+    Args:
+        db: Database session
+        csv_row_id: CSV row ID
+        
+    Returns:
+        Tuple of (CSV row, CSV file)
+        
+    Raises:
+        HTTPException: 404 if the row or its file is not found
+    """
+    result = db.query(CSVRow, CSVFile).outerjoin(
+        CSVFile, CSVFile.id == CSVRow.csv_file_id
+    ).filter(CSVRow.id == csv_row_id).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="CSV row not found")
+    csv_row, csv_file = result
+    if not csv_file:
+        raise HTTPException(status_code=404, detail="CSV file not found")
+    return csv_row, csv_file
+
+
+def upsert_returning(
+    db: Session,
+    model: Type[T],
+    match: Dict[str, Any],
+    values: Dict[str, Any],
+    insert_values: Optional[Dict[str, Any]] = None
+) -> T:
+    """
+    Update the row matching `match` with `values`, or insert it if there is none.
+    
+    Uses UPDATE ... RETURNING / INSERT ... RETURNING so generated columns (id,
+    created_at, updated_at) come back with the write instead of needing a
+    db.refresh() SELECT afterwards. Falls back to an ORM get-or-create on
+    dialects without RETURNING support. Does not commit.
+    
+    Args:
+        db: Database session
+        model: SQLAlchemy model class
+        match: Column values identifying the row (also used when inserting)
+        values: Column values to write
+        insert_values: Extra column values only set when inserting
+        
+    Returns:
+        The updated or inserted model instance
+    """
+    insert_row = {**match, **(insert_values or {}), **values}
+    
+    instance = update_returning(db, model, match, values)
+    if instance is None:
+        instance = insert_returning(db, model, insert_row)
+    return instance
+
+
+def insert_returning(db: Session, model: Type[T], values: Dict[str, Any]) -> T:
+    """
+    Insert a row and return it as a model instance.
+    
+    Uses INSERT ... RETURNING where supported so generated columns (id,
+    created_at, updated_at) come back with the write instead of needing a
+    db.refresh() SELECT after commit; otherwise adds and flushes through the
+    ORM. Does not commit.
+    
+    Args:
+        db: Database session
+        model: SQLAlchemy model class
+        values: Column values for the new row
+        
+    Returns:
+        The inserted model instance
+    """
+    if db.get_bind().dialect.insert_returning:
+        return db.execute(
+            insert(model).values(**values).returning(model),
+            execution_options={"populate_existing": True}
+        ).scalar_one()
+    
+    instance = model(**values)
+    db.add(instance)
+    db.flush()
+    return instance
+
+
+def update_returning(
+    db: Session,
+    model: Type[T],
+    match: Dict[str, Any],
+    values: Dict[str, Any]
+) -> Optional[T]:
     """
-    Find the root prompt ID by traversing parent_prompt_id chain.
-    Optimized to minimize database queries by fetching all prompts in the chain at once.
+    Update the row(s) matching `match` with `values` and return the updated instance.
+    
+    Uses UPDATE ... RETURNING where supported so the written row comes back
+    without a separate SELECT; otherwise loads and updates through the ORM.
+    Does not commit.
+    
+    Args:
+        db: Database session
+        model: SQLAlchemy model class
+        match: Column values identifying the row (None matches NULL)
+        values: Column values to write
+        
+    Returns:
+        The updated model instance, or None if no row matched
+    """
+    criteria = [getattr(model, key) == value for key, value in match.items()]
+    
+    if db.get_bind().dialect.update_returning:
+        # first() rather than one(): NULL keys aren't covered by unique constraints,
+        # so legacy duplicate rows may all match
+        return db.execute(
+            update(model).where(*criteria).values(**values).returning(model)
+        ).scalars().first()
+    
+    instance = db.query(model).filter(*criteria).first()
+    if instance is not None:
+        for key, value in values.items():
+            setattr(instance, key, value)
+        db.flush()
+    return instance
+
+
+def _prompt_ancestors_cte(prompt_id: int):
+    """Recursive CTE of (id, parent_id) for prompt_id and every ancestor above it"""
+    # UNION (not UNION ALL) drops repeated rows, so a circular chain terminates
+    ancestors = select(
+        Prompt.id.label("id"), Prompt.parent_prompt_id.label("parent_id")
+    ).where(Prompt.id == prompt_id).cte("ancestors", recursive=True)
+    return ancestors.union(
+        select(Prompt.id, Prompt.parent_prompt_id).join(ancestors, Prompt.id == ancestors.c.parent_id)
+    )
+
+
+def flatten_prompt_lineage(db: Session) -> int:
+    """
+    Point every prompt version directly at its root prompt.
+    
+    Versions are created with parent_prompt_id set to their root, so that column
+    already is the denormalized root pointer and lineage lookups never walk a
+    chain. This repoints legacy rows whose parent is itself a version; prompts in
+    a circular chain become roots. Does not commit.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        Number of prompts repointed
+    """
+    parent = aliased(Prompt)
+    nested_ids = db.execute(
+        select(Prompt.id)
+        .join(parent, parent.id == Prompt.parent_prompt_id)
+        .where(parent.parent_prompt_id.is_not(None))
+        .order_by(Prompt.id)
+    ).scalars().all()
+    
+    for prompt_id in nested_ids:
+        ancestors = _prompt_ancestors_cte(prompt_id)
+        root_prompt_id = db.execute(
+            select(ancestors.c.id).where(ancestors.c.parent_id.is_(None)).limit(1)
+        ).scalar()
+        # Keep updated_at: this is a data migration, not an edit to the prompt
+        db.execute(
+            update(Prompt)
+            .where(Prompt.id == prompt_id)
+            .values(parent_prompt_id=root_prompt_id, updated_at=Prompt.updated_at)
+        )
+    return len(nested_ids)
+
+
+def migrate_gepa_config_links(db: Session) -> int:
+    """
+    Move GEPA configs' legacy JSON ID lists into the link tables.
+    
+    Databases created before gepa_judge_configs / gepa_function_eval_configs keep
+    judge_config_ids / function_eval_config_ids JSON columns on gepa_configs. Their
+    IDs are copied into the link tables (skipping configs that no longer exist)
+    and the JSON is cleared, so this only does work once. Does not commit.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        Number of GEPA configs migrated
+    """
+    links = {
+        "judge_config_ids": (gepa_judge_configs, "judge_config_id", JudgeConfig),
+        "function_eval_config_ids": (gepa_function_eval_configs, "function_eval_config_id", FunctionEvalConfig),
+    }
+    existing_columns = {column["name"] for column in inspect(db.get_bind()).get_columns("gepa_configs")}
+    legacy_columns = [name for name in links if name in existing_columns]
+    if not legacy_columns:
+        return 0
+    
+    legacy = table("gepa_configs", column("id"), *(column(name, JSON) for name in legacy_columns))
+    rows = db.execute(
+        select(legacy).where(or_(*(legacy.c[name].is_not(None) for name in legacy_columns)))
+    ).mappings().all()
+    if not rows:
+        return 0
+    
+    for name in legacy_columns:
+        link_table, link_column, model = links[name]
+        known_ids = set(db.execute(select(model.id)).scalars())
+        values = [
+            {"gepa_config_id": row["id"], link_column: config_id}
+            for row in rows
+            for config_id in dict.fromkeys(row[name] or [])
+            if config_id in known_ids
+        ]
+        if values:
+            db.execute(insert(link_table), values)
+    
+    db.execute(update(legacy).values({name: null() for name in legacy_columns}))
+    return len(rows)
+
+
+def get_root_prompt_id(db: Session, prompt_id: int, prompt: Optional[Prompt] = None) -> int:
+    """
+    Find the root prompt ID for a prompt.
+    
+    Versions point straight at their root (see flatten_prompt_lineage), so this
+    is the prompt's parent_prompt_id, or its own ID if it has no parent.
     
     Args:
         db: Database session
         prompt_id: Starting prompt ID
+        prompt: The already-loaded prompt for prompt_id, if the caller has it
         
     Returns:
-        Root prompt ID
-    """
-    # First, verify the prompt exists
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
-    if not prompt:
-        return prompt_id
-    
-    # If no parent, this is already the root
-    if not prompt.parent_prompt_id:
-        return prompt_id
-    
-    # Collect all IDs in the chain by traversing up
-    # We'll do a limited number of queries (max depth check)
-    ids_in_chain = [prompt_id]
-    current_parent_id = prompt.parent_prompt_id
-    max_depth = 100  # Prevent infinite loops
-    
-    # Build the chain of IDs
-    while current_parent_id and len(ids_in_chain) < max_depth:
-        if current_parent_id in ids_in_chain:
-            # Circular reference detected, return the first occurrence as root
-            return ids_in_chain[0]
-        ids_in_chain.append(current_parent_id)
-        
-        # Fetch this parent to get its parent_prompt_id
-        parent = db.query(Prompt).filter(Prompt.id == current_parent_id).first()
-        if not parent or not parent.parent_prompt_id:
-            break
-        current_parent_id = parent.parent_prompt_id
-    
-    # Fetch all prompts in the chain in one query
-    prompts = db.query(Prompt).filter(Prompt.id.in_(ids_in_chain)).all()
-    prompt_map = {p.id: p for p in prompts}
-    
-    # Find the root by traversing the map
-    current_id = prompt_id
-    visited = set()  # Prevent infinite loops
-    
-    while current_id in prompt_map:
-        if current_id in visited:
-            # Circular reference detected, return current as root
-            return current_id
-        visited.add(current_id)
-        
-        current_prompt = prompt_map[current_id]
-        if not current_prompt.parent_prompt_id:
-            return current_id
-        current_id = current_prompt.parent_prompt_id
-    
-    return current_id
+        Root prompt ID (prompt_id itself if it doesn't exist or has no parent)
+    """
+    if prompt is None:
+        # Use the prompt if this session already loaded it, without querying for it
+        prompt = db.identity_map.get(identity_key(Prompt, prompt_id))
+    if prompt is not None:
+        parent_prompt_id = prompt.parent_prompt_id
+    else:
+        parent_prompt_id = db.execute(
+            select(Prompt.parent_prompt_id).where(Prompt.id == prompt_id)
+        ).scalar()
+    return parent_prompt_id if parent_prompt_id is not None else prompt_id
 
 
 def get_next_prompt_version(db: Session, root_prompt_id: int) -> int:
@@ -123,8 +482,27 @@ def get_next_prompt_version(db: Session, root_prompt_id: int) -> int:
     Returns:
         Next version number
     """
-    max_version = db.query(func.max(Prompt.version)).filter(
-        (Prompt.parent_prompt_id == root_prompt_id) | (Prompt.id == root_prompt_id)
-    ).scalar() or 0
+    # Core select (no ORM entity processing); each branch is a single index seek,
+    # the root by primary key and its versions' MAX on (parent_prompt_id, version)
+    versions = union_all(
+        select(Prompt.version.label("version")).where(Prompt.id == root_prompt_id),
+        select(func.max(Prompt.version)).where(Prompt.parent_prompt_id == root_prompt_id),
+    ).subquery()
+    max_version = db.execute(select(func.max(versions.c.version))).scalar() or 0
     return max_version + 1
 
+
+def get_root_and_next_version(db: Session, prompt_id: int, prompt: Optional[Prompt] = None) -> Tuple[int, int]:
+    """
+    Resolve a prompt's root and the next version number under it.
+    
+    Args:
+        db: Database session
+        prompt_id: Prompt the new version is based on
+        prompt: The already-loaded prompt for prompt_id, if the caller has it
+        
+    Returns:
+        Tuple of (root prompt ID, next version number)
+    """
+    root_prompt_id = get_root_prompt_id(db, prompt_id, prompt)
+    return root_prompt_id, get_next_prompt_version(db, root_prompt_id)
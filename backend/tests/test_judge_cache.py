@@ -0,0 +1,83 @@
+"""Judge replies only enter the LLM response cache once their score parses"""
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Point the app at a throwaway database before anything imports app.database
+_db_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir.name, 'test.db')}"
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from app.database import Base, engine  # noqa: E402
+from app.models import JudgeConfig  # noqa: E402
+from app.services import llm_service as llm_service_module  # noqa: E402
+from app.services.judge_service import run_judge_evaluation  # noqa: E402
+from app.services.llm_cache import llm_cache  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+def _response(content: str) -> SimpleNamespace:
+    """Minimal stand-in for a LiteLLM completion response"""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeCompletion:
+    """Async acompletion replacement returning the given replies in order, then the last one"""
+
+    def __init__(self, *replies: str):
+        self.replies = list(replies)
+        self.calls = 0
+
+    async def __call__(self, **kwargs):
+        reply = self.replies[min(self.calls, len(self.replies) - 1)]
+        self.calls += 1
+        return _response(reply)
+
+
+class JudgeCacheTest(unittest.IsolatedAsyncioTestCase):
+    def _judge(self, prompt: str) -> JudgeConfig:
+        # Deterministic settings, so the judge call goes through the cache
+        return JudgeConfig(name="judge", prompt=prompt, model="test/model", temperature=0.0, max_tokens=100)
+
+    async def test_bad_reply_is_not_cached_and_good_retry_is(self):
+        judge = self._judge("Is the answer polite? (bad then good)")
+        fake = FakeCompletion("I think it's fine", "Polite. <score>1</score>")
+
+        with patch.object(llm_service_module, "acompletion", fake):
+            with self.assertRaises(ValueError):
+                await run_judge_evaluation(judge, {}, "hello", ())
+
+            # The retry makes a fresh call instead of replaying the bad reply
+            score, raw_output = await run_judge_evaluation(judge, {}, "hello", ())
+            self.assertEqual(score, 1.0)
+            self.assertEqual(fake.calls, 2)
+
+            # Later runs are served the good reply from the cache
+            score, _ = await run_judge_evaluation(judge, {}, "hello", ())
+            self.assertEqual(score, 1.0)
+            self.assertEqual(fake.calls, 2)
+
+    async def test_bad_cached_reply_is_replaced(self):
+        judge = self._judge("Is the answer polite? (stale entry)")
+        fake = FakeCompletion("Polite. <score>0.5</score>")
+
+        # An unparseable reply cached before validation existed
+        prompt = llm_service_module.llm_service.build_judge_prompt(judge.prompt, {"Output": "hello"}, ("Output",))
+        key = llm_service_module.LLMService._cache_key(
+            judge.model, judge.temperature, judge.max_tokens, [{"role": "user", "content": prompt}]
+        )
+        await llm_cache.set(key, "I think it's fine")
+
+        with patch.object(llm_service_module, "acompletion", fake):
+            score, _ = await run_judge_evaluation(judge, {}, "hello", ())
+
+        self.assertEqual(score, 0.5)
+        self.assertEqual(fake.calls, 1)
+        self.assertEqual(await llm_cache.get(key), "Polite. <score>0.5</score>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 """Function-based evaluations package for Evaluizer."""
 
 from .base import EvaluationContext, EvaluationResult, EvaluationPlugin
-from .registry import list_plugins, get_plugin, register_plugin, refresh_plugins
+from .registry import list_plugins, get_plugin, get_plugin_or_none, register_plugin, refresh_plugins
 
 # Import plugins to trigger their registration
 # This must happen after registry functions are defined
@@ -13,6 +13,7 @@ __all__ = [
     "EvaluationPlugin",
     "list_plugins",
     "get_plugin",
+    "get_plugin_or_none",
     "register_plugin",
     "refresh_plugins",
 ]
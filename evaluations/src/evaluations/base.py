@@ -1,11 +1,19 @@
 """Base interfaces and types for function-based evaluations."""
 
 from typing import Protocol, Any, Optional
+from dataclasses import dataclass
 from pydantic import BaseModel
 
 
-class EvaluationContext(BaseModel):
-    """Context provided to an evaluation plugin when running."""
+@dataclass(slots=True)
+class EvaluationContext:
+    """
+    Context provided to an evaluation plugin when running.
+    
+    A plain slotted dataclass rather than a Pydantic model: it is built once per
+    row by the backend from already-validated data, so validating it again (and
+    copying the row dict) is wasted work.
+    """
     row: dict[str, Any]  # The CSV row data as a dictionary
     output: Optional[str] = None  # The output string to evaluate (may be None)
     config: Optional[dict[str, Any]] = None  # Optional configuration for the evaluation
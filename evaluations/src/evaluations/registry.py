@@ -79,6 +79,22 @@ def get_plugin(name: str) -> EvaluationPlugin:
     return plugin_info.instance
 
 
+def get_plugin_or_none(name: str) -> Optional[EvaluationPlugin]:
+    """
+    Get an instance of a plugin by name, or None if it isn't registered.
+    
+    Args:
+        name: The name of the plugin to retrieve
+        
+    Returns:
+        The shared instance of the plugin, or None
+    """
+    plugin_info = _registry.get(name)
+    if plugin_info is None:
+        return None
+    return plugin_info.instance
+
+
 def refresh_plugins() -> None:
     """
     Re-discover and reload all plugin modules.
@@ -1,5 +1,5 @@
 import { useMemo, useState, useEffect, useCallback, useRef } from 'react';
-import { Evaluation, JudgeResult, FunctionEvalResult, JudgeConfig, FunctionEvalConfig, Metric, listMetrics, createOrUpdateMetric, deleteMetric, GepaConfig, listGepaConfigs, createGepaConfig, updateGepaConfig, deleteGepaConfig, runGepa, subscribeToGepaProgress, GepaProgress, Prompt, BestPromptsResponse, getBestPromptsForMetrics } from '../services/api';
+import { Evaluation, JudgeResult, FunctionEvalResult, JudgeConfig, FunctionEvalConfig, Metric, listMetrics, createOrUpdateMetric, deleteMetric, GepaConfig, listGepaConfigs, createGepaConfig, updateGepaConfig, deleteGepaConfig, runGepa, subscribeToGepaProgress, GepaProgress, Prompt, BestPromptInfo, BestPromptsResponse, getBestPromptsForMetrics } from '../services/api';
 
 function Timer({ startTime, updatedAt, status }: { startTime: string; updatedAt: string; status: string }) {
   const [now, setNow] = useState(Date.now());
@@ -69,6 +69,18 @@ export default function OptimizerPanel({
   const [bestPrompts, setBestPrompts] = useState<BestPromptsResponse | null>(null);
   const [_isLoadingBestPrompts, setIsLoadingBestPrompts] = useState(false);
   
+  // Best prompts keyed by config id, for lookups while rendering each config row
+  const judgeBestPrompts = useMemo(() => {
+    const byConfigId: Record<number, BestPromptInfo | null> = {};
+    bestPrompts?.judge_configs.forEach(entry => { byConfigId[entry.config_id] = entry.info; });
+    return byConfigId;
+  }, [bestPrompts]);
+  const functionEvalBestPrompts = useMemo(() => {
+    const byConfigId: Record<number, BestPromptInfo | null> = {};
+    bestPrompts?.function_eval_configs.forEach(entry => { byConfigId[entry.config_id] = entry.info; });
+    return byConfigId;
+  }, [bestPrompts]);
+  
   // GEPA state
   const [gepaConfigs, setGepaConfigs] = useState<GepaConfig[]>([]);
   const [isLoadingGepaConfigs, setIsLoadingGepaConfigs] = useState(false);
@@ -798,7 +810,7 @@ export default function OptimizerPanel({
                       ({count})
                     </div>
                   </div>
-                  {bestPrompts?.judge_configs[config.id] && (
+                  {judgeBestPrompts[config.id] && (
                     <div style={{
                       fontSize: '0.5rem',
                       color: 'var(--text-tertiary)',
@@ -806,7 +818,7 @@ export default function OptimizerPanel({
                       fontWeight: '400',
                       textAlign: 'right',
                     }}>
-                      BEST: {bestPrompts.judge_configs[config.id]!.name || 'Unnamed'} v{bestPrompts.judge_configs[config.id]!.version} ({bestPrompts.judge_configs[config.id]!.average_score.toFixed(2)})
+                      BEST: {judgeBestPrompts[config.id]!.name || 'Unnamed'} v{judgeBestPrompts[config.id]!.version} ({judgeBestPrompts[config.id]!.average_score.toFixed(2)})
                     </div>
                   )}
                 </div>
@@ -917,7 +929,7 @@ export default function OptimizerPanel({
                       ({count})
                     </div>
                   </div>
-                  {bestPrompts?.function_eval_configs[config.id] && (
+                  {functionEvalBestPrompts[config.id] && (
                     <div style={{
                       fontSize: '0.5rem',
                       color: 'var(--text-tertiary)',
@@ -925,7 +937,7 @@ export default function OptimizerPanel({
                       fontWeight: '400',
                       textAlign: 'right',
                     }}>
-                      BEST: {bestPrompts.function_eval_configs[config.id]!.name || 'Unnamed'} v{bestPrompts.function_eval_configs[config.id]!.version} ({bestPrompts.function_eval_configs[config.id]!.average_score.toFixed(2)})
+                      BEST: {functionEvalBestPrompts[config.id]!.name || 'Unnamed'} v{functionEvalBestPrompts[config.id]!.version} ({functionEvalBestPrompts[config.id]!.average_score.toFixed(2)})
                     </div>
                   )}
                 </div>
@@ -8,6 +8,7 @@ import {
   deleteFunctionEvalConfig, 
   getFunctionEvalResultsForCSV, 
   runFunctionEval, 
+  runFunctionEvalBatch, 
   deleteFunctionEvalResult, 
   deleteFunctionEvalResultsForConfig,
   getEvaluationsForCSV,
@@ -174,26 +175,28 @@ export function useFunctionEvals(
         batches.push(validRowIds.slice(i, i + concurrencyLimit));
       }
 
+      // Each batch of rows is evaluated and saved by a single request
       for (const batch of batches) {
-        const batchPromises = batch.map(async (rowId) => {
-          try {
-            const result = await runFunctionEval(configId, rowId, currentPrompt.id);
+        try {
+          const batchResults = await runFunctionEvalBatch(configId, batch, currentPrompt.id);
+          const saved = batchResults.flatMap(r => (r.result ? [r.result] : []));
+          const failed = batchResults.find(r => r.error);
+          if (failed) {
+            setErrorWithTimestamp(failed.error ?? `Failed to run function eval for row ${failed.csv_row_id}`);
+          }
+          if (saved.length > 0) {
+            const savedRowIds = new Set(saved.map(r => r.csv_row_id));
             setTimeout(() => {
-              setLatestFunctionEvalResult(result);
+              setLatestFunctionEvalResult(saved[saved.length - 1]);
               setFunctionEvalResults(prev => {
-                const next = prev.filter(r => !(r.config_id === configId && r.csv_row_id === rowId && r.prompt_id === currentPrompt.id));
-                return [...next, result];
+                const next = prev.filter(r => !(r.config_id === configId && savedRowIds.has(r.csv_row_id) && r.prompt_id === currentPrompt.id));
+                return [...next, ...saved];
               });
             }, 0);
-            return { success: true, rowId, result };
-          } catch (err) {
-            const errorMessage = err instanceof Error ? err.message : `Failed to run function eval for row ${rowId}`;
-            setErrorWithTimestamp(errorMessage);
-            return { success: false, rowId, error: err };
           }
-        });
-
-        await Promise.allSettled(batchPromises);
+        } catch (err) {
+          setErrorWithTimestamp(err instanceof Error ? err.message : 'Failed to run function evaluations');
+        }
       }
       setErrorWithTimestamp(null);
     } catch (err) {
@@ -100,6 +100,12 @@ export interface FunctionEvalResult {
   updated_at: string;
 }
 
+export interface FunctionEvalBatchResult {
+  csv_row_id: number;
+  result: FunctionEvalResult | null;
+  error: string | null;
+}
+
 export interface Metric {
   id: number;
   csv_file_id: number;
@@ -568,6 +574,18 @@ export async function runFunctionEval(configId: number, csvRowId: number, prompt
   });
 }
 
+export async function runFunctionEvalBatch(configId: number, csvRowIds: number[], promptId: number): Promise<FunctionEvalBatchResult[]> {
+  return fetchAPI<FunctionEvalBatchResult[]>('/function-eval/run/batch', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      config_id: configId,
+      prompt_id: promptId,
+      csv_row_ids: csvRowIds,
+    }),
+  });
+}
+
 export async function deleteFunctionEvalResult(configId: number, rowId: number, promptId: number): Promise<void> {
   return fetchAPI<void>(`/function-eval/results/config/${configId}/row/${rowId}?prompt_id=${promptId}`, { method: 'DELETE' });
 }
@@ -617,10 +635,15 @@ export interface BestPromptInfo {
   result_count: number;
 }
 
+export interface BestPromptConfigEntry {
+  config_id: number;
+  info: BestPromptInfo | null;
+}
+
 export interface BestPromptsResponse {
   human_annotation?: BestPromptInfo | null;
-  judge_configs: Record<number, BestPromptInfo | null>;
-  function_eval_configs: Record<number, BestPromptInfo | null>;
+  judge_configs: BestPromptConfigEntry[];
+  function_eval_configs: BestPromptConfigEntry[];
 }
 
 export async function getBestPromptsForMetrics(csvFileId: number): Promise<BestPromptsResponse> {